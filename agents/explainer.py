@@ -1,41 +1,25 @@
-from typing import Dict, Any, List
-import json
+from typing import Dict, Any, List, Optional, Tuple
+from functools import lru_cache
+import hashlib
+import orjson
 
+_dumps = orjson.dumps
 
-class ExplainerAgent:
-    """
-    Explains a VERIFIED and APPROVED solution.
-
-    ABSOLUTE CONSTRAINTS:
-    - Never re-solve
-    - Never modify steps
-    - Never introduce new reasoning
-    - Never decide correctness
-    """
+# Shared default for a missing "steps" key. NEVER mutate.
+_EMPTY: List[Any] = []
 
-    def __init__(self, llm, style: str = "friendly"):
-        self.llm = llm
-        self.style = style
 
-    def _create_prompt(
-        self,
-        problem_text: str,
-        verified_solution: Dict[str, Any]
-    ) -> str:
-        style_instructions = {
-            "friendly": "Use a friendly, student-friendly tone.",
-            "formal": "Use a formal, academic tone.",
-            "concise": "Be brief and precise.",
-            "detailed": "Explain carefully without adding new logic."
-        }.get(self.style, "Use a clear and neutral tone.")
+_STYLE_INSTRUCTIONS = {
+    "friendly": "Use a friendly, student-friendly tone.",
+    "formal": "Use a formal, academic tone.",
+    "concise": "Be brief and precise.",
+    "detailed": "Explain carefully without adding new logic."
+}
 
-        steps: List[str] = verified_solution.get("steps", [])
+_DEFAULT_STYLE = "Use a clear and neutral tone."
 
-        formatted_steps = "\n".join(
-            f"{i+1}. {step}" for i, step in enumerate(steps)
-        )
-
-        return f"""
+# Static prompt module; only the tone varies, and that is fixed per agent
+_EXPLAINER_STATIC_PREFIX = """
 You are an Explainer Agent.
 
 The solution below has ALREADY BEEN:
@@ -68,18 +52,6 @@ TONE
 ────────────────────────────────────────
 {style_instructions}
 
-────────────────────────────────────────
-INPUT
-────────────────────────────────────────
-Problem:
-{problem_text}
-
-Verified Steps:
-{formatted_steps}
-
-Final Answer (READ-ONLY):
-{verified_solution.get("final_answer", "")}
-
 ────────────────────────────────────────
 OUTPUT RULES
 ────────────────────────────────────────
@@ -113,6 +85,149 @@ FAILURE MODE:
 }}
 """
 
+# Dynamic tail, appended after the cached static prefix
+_EXPLAINER_SUFFIX_TMPL = """
+────────────────────────────────────────
+INPUT
+────────────────────────────────────────
+Problem:
+{problem_text}
+
+Verified Steps:
+{formatted_steps}
+
+Final Answer (READ-ONLY):
+{final_answer}
+"""
+
+
+# (steps, cache key, generate() kwargs) of a pending explainer call
+_Call = Tuple[List[Any], bytes, Dict[str, Any]]
+
+
+@lru_cache(maxsize=256)
+def _format_steps(steps: Tuple[Any, ...]) -> str:
+    """
+    Numbered step list, memoized so retries of the same
+    solution (e.g. at a different style) skip re-formatting.
+    """
+    buf: List[str] = []
+    ap = buf.append
+    for i, step in enumerate(steps, 1):
+        ap(str(i)); ap(". "); ap(str(step)); ap("\n")
+    return "".join(buf)
+
+
+class ExplainerAgent:
+    """
+    Explains a VERIFIED and APPROVED solution.
+
+    ABSOLUTE CONSTRAINTS:
+    - Never re-solve
+    - Never modify steps
+    - Never introduce new reasoning
+    - Never decide correctness
+    """
+
+    def __init__(self, llm, style: str = "friendly", cache_size: int = 1024):
+        self.llm = llm
+        self.style = style
+        self.cache_size = cache_size
+        self._cache: Dict[bytes, Dict[str, Any]] = {}
+
+        self.prefix_id = f"explainer_v1:{style}"
+        self.llm.register_cached_prefix(
+            self.prefix_id,
+            _EXPLAINER_STATIC_PREFIX.format_map({
+                "style_instructions": _STYLE_INSTRUCTIONS.get(style, _DEFAULT_STYLE)
+            })
+        )
+
+    # --------------------------------------------------
+    # RESPONSE CACHE
+    # --------------------------------------------------
+
+    def _cache_key(
+        self,
+        problem_text: str,
+        steps: List[Any],
+        final_answer: Any
+    ) -> bytes:
+        """
+        Structural key: whitespace differences in the problem or
+        steps must not cause a cache miss.
+        """
+        normalized_steps = [
+            " ".join(step.split()) if isinstance(step, str) else step
+            for step in steps
+        ]
+        payload = _dumps((
+            self.style,
+            " ".join(str(problem_text).split()),
+            normalized_steps,
+            final_answer
+        ), option=orjson.OPT_SORT_KEYS, default=str)
+        return hashlib.blake2b(payload, digest_size=16).digest()
+
+    def _cache_store(self, key: bytes, result: Dict[str, Any]) -> None:
+        if len(self._cache) >= self.cache_size:
+            # Evict the oldest entry (dicts preserve insertion order)
+            self._cache.pop(next(iter(self._cache)))
+        self._cache[key] = result
+
+    def _dynamic_suffix(
+        self,
+        problem_text: str,
+        verified_solution: Dict[str, Any],
+        steps: List[Any]
+    ) -> str:
+        steps_key = tuple(steps)
+        try:
+            formatted_steps = _format_steps(steps_key)
+        except TypeError:
+            # Unhashable step entries: format without memoizing
+            formatted_steps = _format_steps.__wrapped__(steps_key)
+
+        return _EXPLAINER_SUFFIX_TMPL.format_map({
+            "problem_text": problem_text,
+            "formatted_steps": formatted_steps,
+            "final_answer": verified_solution.get("final_answer", "")
+        })
+
+    def _prepare(
+        self,
+        problem_text: str,
+        verified_solution: Dict[str, Any]
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[_Call]]:
+        """
+        Shared front half of explain() / aexplain(): validation, cache
+        lookup and prompt. Returns (result, None) when no LLM call is
+        needed, else (None, (steps, cache key, generate() kwargs)).
+        """
+
+        steps = verified_solution.get("steps", _EMPTY)
+
+        if not isinstance(steps, list):
+            return {
+                "explanation": [],
+                "key_concepts": [],
+                "common_mistakes": []
+            }, None
+
+        key = self._cache_key(
+            problem_text, steps, verified_solution.get("final_answer")
+        )
+        cached = self._cache.get(key)
+        if cached is not None:
+            return dict(cached), None
+
+        return None, (steps, key, {
+            "prefix_id": self.prefix_id,
+            "suffix": self._dynamic_suffix(problem_text, verified_solution, steps),
+            "temperature": 0.2,
+            "response_format": "json_object"
+        })
+
     def explain(
         self,
         problem_text: str,
@@ -125,24 +240,55 @@ FAILURE MODE:
         It MUST NOT affect execution.
         """
 
-        steps = verified_solution.get("steps", [])
+        result, call = self._prepare(problem_text, verified_solution)
+        if result is not None:
+            return result
 
-        if not isinstance(steps, list):
-            return {
-                "explanation": [],
-                "key_concepts": [],
-                "common_mistakes": []
-            }
+        steps, key, request = call
+        return self._parse_response(self.llm.generate(**request), steps, key)
+
+    async def aexplain(
+        self,
+        problem_text: str,
+        verified_solution: Dict[str, Any],
+        verification_confidence: float = 1.0
+    ) -> Dict[str, Any]:
+        """
+        Async variant of explain(); same contract and cache.
+        """
+
+        result, call = self._prepare(problem_text, verified_solution)
+        if result is not None:
+            return result
+
+        steps, key, request = call
+        return self._parse_response(await self.llm.agenerate(**request), steps, key)
 
-        prompt = self._create_prompt(problem_text, verified_solution)
-        response = self.llm.generate(prompt, temperature=0.2)
+    # --------------------------------------------------
+    # RESPONSE VALIDATION
+    # --------------------------------------------------
 
+    def _parse_response(
+        self,
+        response: Any,
+        steps: List[Any],
+        key: bytes
+    ) -> Dict[str, Any]:
         try:
-            parsed = (
-                json.loads(response)
-                if isinstance(response, str)
-                else response
-            )
+            # Fast path: the client already decoded the JSON-mode output
+            if isinstance(response, dict) and "parsed_json" in response:
+                parsed = response["parsed_json"]
+            elif isinstance(response, (bytes, bytearray, str)):
+                parsed = orjson.loads(response)
+            else:
+                parsed = response
+
+            if not isinstance(parsed, dict):
+                return {
+                    "explanation": [],
+                    "key_concepts": [],
+                    "common_mistakes": []
+                }
 
             explanation = parsed.get("explanation", [])
             key_concepts = parsed.get("key_concepts", [])
@@ -156,12 +302,18 @@ FAILURE MODE:
                     "common_mistakes": []
                 }
 
-            return {
+            result = {
                 "explanation": explanation,
                 "key_concepts": key_concepts if isinstance(key_concepts, list) else [],
                 "common_mistakes": common_mistakes if isinstance(common_mistakes, list) else []
             }
 
+            # Only cache usable explanations; failures stay retryable
+            if explanation or not steps:
+                self._cache_store(key, result)
+
+            return dict(result)
+
         except Exception:
             # In HITL systems, silence > hallucination
             return {
@@ -1,39 +1,14 @@
-from typing import Dict, Any, List
-import json
+from typing import Dict, Any, List, Mapping, Optional
+from collections import OrderedDict
+from types import MappingProxyType
+import hashlib
+import orjson
 
+_dumps = orjson.dumps
 
-class IntentRouter:
-    """
-    Classifies a parsed math problem into a solver route.
-
-    RULES:
-    - Never solve
-    - Never explain
-    - Never transform the problem
-    - Only classify intent
-    """
-
-    VALID_ROUTES = {
-        "algebra_equation",
-        "probability_basic",
-        "calculus_limit",
-        "calculus_derivative",
-        "calculus_optimization",
-        "linear_algebra_basic",
-        "out_of_scope"
-    }
-
-    VALID_DIFFICULTIES = {"easy", "medium", "hard", "unknown"}
 
-    def __init__(self, llm):
-        self.llm = llm
-
-    # --------------------------------------------------
-    # PROMPT
-    # --------------------------------------------------
-
-    def _create_prompt(self, problem_data: Dict[str, Any]) -> str:
-        return f"""
+# Static prompt module, shared by every routing call
+_ROUTER_STATIC_PREFIX = """
 You are an Intent Router Agent.
 
 Your ONLY task is to classify the problem into ONE predefined route.
@@ -62,56 +37,256 @@ FORBIDDEN:
 - No text outside JSON
 
 OUTPUT FORMAT (STRICT JSON):
-{{
+{
   "route": "<allowed_route>",
   "difficulty": "<easy|medium|hard|unknown>",
   "tools_allowed": []
-}}
+}
+"""
 
+# Dynamic tail, appended after the cached static prefix
+_ROUTER_SUFFIX_TMPL = """
 INPUT:
 Problem:
-{problem_data.get("problem_text", "")}
+{problem_text}
 
 Topic (from parser):
-{problem_data.get("topic", "unknown")}
+{topic}
 
 Variables:
-{problem_data.get("variables", [])}
+{variables}
 
 Constraints:
-{problem_data.get("constraints", [])}
+{constraints}
 """
 
+_ROUTER_PREFIX_ID = "router_v1"
+
+# Parser topic -> solver route
+_TOPIC_TO_ROUTE: Mapping[str, str] = MappingProxyType({
+    "algebra": "algebra_equation",
+    "probability": "probability_basic",
+    "calculus_limit": "calculus_limit",
+    "calculus_derivative": "calculus_derivative",
+    "calculus_optimization": "calculus_optimization",
+    "linear_algebra": "linear_algebra_basic"
+})
+
+# Prebuilt, read-only routing results for parser-trusted topics
+_ROUTE_RESULTS: Mapping[str, Mapping[str, Any]] = MappingProxyType({
+    route: MappingProxyType({
+        "route": route,
+        "difficulty": "medium",
+        "tools_allowed": ()
+    })
+    for route in _TOPIC_TO_ROUTE.values()
+})
+
+
+class IntentRouter:
+    """
+    Classifies a parsed math problem into a solver route.
+
+    RULES:
+    - Never solve
+    - Never explain
+    - Never transform the problem
+    - Only classify intent
+    """
+
+    VALID_ROUTES = frozenset({
+        "algebra_equation",
+        "probability_basic",
+        "calculus_limit",
+        "calculus_derivative",
+        "calculus_optimization",
+        "linear_algebra_basic",
+        "out_of_scope"
+    })
+
+    VALID_DIFFICULTIES = frozenset({"easy", "medium", "hard", "unknown"})
+
+    VALID_TOOLS = frozenset({"python"})
+
+    # Most common route; the pipeline may start solving with it while
+    # an LLM routing decision is still in flight
+    SPECULATIVE_ROUTE = _ROUTE_RESULTS["algebra_equation"]
+
+    def __init__(self, llm, cache_size: int = 4096):
+        self.llm = llm
+        self.cache_size = cache_size
+        self._route_cache: "OrderedDict[bytes, Dict[str, Any]]" = OrderedDict()
+        self.llm.register_cached_prefix(_ROUTER_PREFIX_ID, _ROUTER_STATIC_PREFIX)
+
+    # --------------------------------------------------
+    # PROMPT
+    # --------------------------------------------------
+
+    def _dynamic_suffix(self, problem_data: Dict[str, Any]) -> str:
+        return _ROUTER_SUFFIX_TMPL.format_map({
+            "problem_text": problem_data.get("problem_text", ""),
+            "topic": problem_data.get("topic", "unknown"),
+            "variables": problem_data.get("variables", []),
+            "constraints": problem_data.get("constraints", [])
+        })
+
     # --------------------------------------------------
     # PRIMARY ROUTING LOGIC
     # --------------------------------------------------
 
-    def route(self, problem_data: Dict[str, Any]) -> Dict[str, Any]:
+    def route(self, problem_data: Dict[str, Any]) -> Mapping[str, Any]:
         """
         Routing priority:
         1. Trust Parser Agent if topic is clean
         2. Fallback to LLM classification
         3. Fail closed (out_of_scope)
+
+        Parser-trusted results are shared and read-only;
+        copy with dict() before mutating.
+        """
+
+        # ✅ PRIMARY: Parser Agent authority
+        trusted = self._parser_route(problem_data)
+        if trusted is not None:
+            return trusted
+
+        # 🔁 FALLBACK: LLM-based routing
+        return self._llm_route(problem_data)
+
+    async def aroute(self, problem_data: Dict[str, Any]) -> Mapping[str, Any]:
         """
+        Async variant of route(); same priority and cache.
+        """
+
+        trusted = self._parser_route(problem_data)
+        if trusted is not None:
+            return trusted
 
+        return await self._allm_route(problem_data)
+
+    def is_trusted(self, problem_data: Dict[str, Any]) -> bool:
+        """
+        True if routing is decided by the parser topic, without an LLM call.
+        """
+        return self._parser_route(problem_data) is not None
+
+    def _parser_route(
+        self,
+        problem_data: Dict[str, Any]
+    ) -> Optional[Mapping[str, Any]]:
         topic = problem_data.get("topic")
 
-        TOPIC_TO_ROUTE = {
-            "algebra": "algebra_equation",
-            "probability": "probability_basic",
-            "calculus_limit": "calculus_limit",
-            "calculus_derivative": "calculus_derivative",
-            "calculus_optimization": "calculus_optimization",
-            "linear_algebra": "linear_algebra_basic"
+        if isinstance(topic, str):
+            route = _TOPIC_TO_ROUTE.get(topic)
+            if route:
+                return _ROUTE_RESULTS[route]
+
+        return None
+
+    # --------------------------------------------------
+    # LLM FALLBACK
+    # --------------------------------------------------
+
+    def _cache_key(self, problem_data: Dict[str, Any]) -> bytes:
+        payload = _dumps((
+            problem_data.get("problem_text", ""),
+            problem_data.get("topic", "unknown"),
+            problem_data.get("variables", []),
+            problem_data.get("constraints", [])
+        ), option=orjson.OPT_SORT_KEYS, default=str)
+        return hashlib.blake2b(payload, digest_size=16).digest()
+
+    def _cache_get(self, key: bytes) -> Optional[Dict[str, Any]]:
+        cached = self._route_cache.get(key)
+        if cached is None:
+            return None
+        self._route_cache.move_to_end(key)
+        return {**cached, "tools_allowed": list(cached["tools_allowed"])}
+
+    def _llm_route(self, problem_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        LLM classification, memoized per instance (LRU).
+        Only validated routes are cached; fail-closed results are not.
+        """
+        key = self._cache_key(problem_data)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+
+        llm_response = self.llm.generate(
+            prefix_id=_ROUTER_PREFIX_ID,
+            suffix=self._dynamic_suffix(problem_data),
+            temperature=0.1
+        )
+        return self._parse_response(llm_response, key)
+
+    async def _allm_route(self, problem_data: Dict[str, Any]) -> Dict[str, Any]:
+        key = self._cache_key(problem_data)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+
+        llm_response = await self.llm.agenerate(
+            prefix_id=_ROUTER_PREFIX_ID,
+            suffix=self._dynamic_suffix(problem_data),
+            temperature=0.1
+        )
+        return self._parse_response(llm_response, key)
+
+    def _parse_response(
+        self,
+        llm_response: Dict[str, Any],
+        key: bytes
+    ) -> Dict[str, Any]:
+        valid_routes = IntentRouter.VALID_ROUTES
+        valid_difficulties = IntentRouter.VALID_DIFFICULTIES
+        valid_tools = IntentRouter.VALID_TOOLS
+
+        if not llm_response.get("success"):
+            return self._fail_closed()
+
+        data = llm_response.get("parsed_json")
+
+        if not isinstance(data, dict):
+            return self._fail_closed()
+
+        route = data.get("route")
+        if not isinstance(route, str) or route not in valid_routes:
+            return self._fail_closed()
+
+        difficulty = data.get("difficulty", "unknown")
+        if not isinstance(difficulty, str) or difficulty not in valid_difficulties:
+            difficulty = "unknown"
+
+        tools = data.get("tools_allowed", [])
+        if not isinstance(tools, list):
+            tools = []
+
+        result = {
+            "route": route,
+            "difficulty": difficulty,
+            "tools_allowed": [
+                t for t in tools if isinstance(t, str) and t in valid_tools
+            ]
         }
 
-        # ✅ PRIMARY: Parser Agent authority
-        if isinstance(topic, str) and topic in TOPIC_TO_ROUTE:
-            return {
-                "route": TOPIC_TO_ROUTE[topic],
-                "difficulty": "medium",
-                "tools_allowed": []
-            }
+        self._route_cache[key] = result
+        if len(self._route_cache) > self.cache_size:
+            self._route_cache.popitem(last=False)
+
+        return {**result, "tools_allowed": list(result["tools_allowed"])}
+
+    # --------------------------------------------------
+    # FAIL CLOSED
+    # --------------------------------------------------
+
+    def _fail_closed(self) -> Dict[str, Any]:
+        """
+        Any routing failure MUST resolve to out_of_scope.
+        """
+        return {
+            "route": "out_of_scope",
+            "difficulty": "unknown",
+            "tools_allowed": []
+        }
 
-        # 🔁 FALLBACK: LLM-based routing
-        return self._llm_
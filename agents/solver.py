@@ -1,33 +1,17 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Mapping, Optional
+from functools import cached_property
+import re
+from types import MappingProxyType
 from tools.python_tool import PythonTool
 
+_REQUIRED_KEYS = frozenset(("final_answer", "steps", "tool_requests"))
 
-class SolverAgent:
-    """
-    Produces a candidate solution for a structured math problem.
-
-    IMPORTANT:
-    - This agent does NOT decide correctness.
-    - This agent does NOT finalize answers.
-    - All outputs are subject to verification and human review.
-    """
-
-    def __init__(self, llm, python_tool: Optional[PythonTool] = None):
-        self.llm = llm
-        self.python_tool = python_tool or PythonTool()
-
-    def _create_prompt(
-        self,
-        problem_text: str,
-        route: str,
-        difficulty: str,
-        tools_allowed: List[str],
-        rag_context: Optional[List[str]]
-    ) -> str:
+# One non-blank line per step; a leading "- " / "• " bullet is dropped.
+# The bullet needs trailing whitespace so "-3x = 6" keeps its sign.
+_STEP_LINE_RE = re.compile(r"(?m)^\s*(?:[-•]\s+)?(\S.*?)\s*$")
 
-        context = "\n".join(rag_context) if rag_context else "No external context provided."
-
-        return f"""
+# Static prompt module, shared by every solve call
+_SOLVER_STATIC_PREFIX = """
 You are a deterministic Solver Agent.
 
 Your responsibility is to generate a *candidate solution*.
@@ -44,11 +28,11 @@ STRICT OUTPUT GUARANTEES (NON-NEGOTIABLE)
 3. NO extra keys. NO missing keys.
 4. NO markdown. NO commentary. NO text outside JSON.
 5. If rules cannot be satisfied, return:
-{{
+{
   "final_answer": "",
   "steps": [],
   "tool_requests": []
-}}
+}
 
 ────────────────────────────────────────
 STEPS FIELD RULES
@@ -69,32 +53,88 @@ FINAL ANSWER RULES
 ────────────────────────────────────────
 TOOL USAGE RULES
 ────────────────────────────────────────
-- Allowed tools: {tools_allowed}
+- Only request tools listed under "Allowed tools" below.
 - If no tools are required → EMPTY array.
 - Never fabricate tool outputs.
 
+────────────────────────────────────────
+EXACT OUTPUT FORMAT
+────────────────────────────────────────
+{
+  "final_answer": "string",
+  "steps": ["step 1", "step 2"],
+  "tool_requests": []
+}
+"""
+
+# Dynamic tail, appended after the cached static prefix
+_SOLVER_SUFFIX_TMPL = """
 ────────────────────────────────────────
 INPUT METADATA (READ-ONLY)
 ────────────────────────────────────────
 Route: {route}
 Difficulty: {difficulty}
+Allowed tools: {tools_allowed}
 
 Problem:
 {problem_text}
 
 Retrieved Context:
 {context}
-
-────────────────────────────────────────
-EXACT OUTPUT FORMAT
-────────────────────────────────────────
-{{
-  "final_answer": "string",
-  "steps": ["step 1", "step 2"],
-  "tool_requests": []
-}}
 """
 
+_SOLVER_PREFIX_ID = "solver_v1"
+
+
+class SolverAgent:
+    """
+    Produces a candidate solution for a structured math problem.
+
+    IMPORTANT:
+    - This agent does NOT decide correctness.
+    - This agent does NOT finalize answers.
+    - All outputs are subject to verification and human review.
+    """
+
+    # Shared, read-only rejection for out-of-scope routes
+    _OOS_RESPONSE: Mapping[str, Any] = MappingProxyType({
+        "status": "CANDIDATE_FAILED",
+        "error": "Problem out of supported scope",
+        "solution": None
+    })
+
+    def __init__(self, llm, python_tool: Optional[PythonTool] = None):
+        self.llm = llm
+        self._python_tool_factory = python_tool
+        self.llm.register_cached_prefix(_SOLVER_PREFIX_ID, _SOLVER_STATIC_PREFIX)
+
+    @cached_property
+    def python_tool(self) -> PythonTool:
+        """
+        Built on first use, so agents that never call a tool
+        never construct one.
+        """
+        return self._python_tool_factory or PythonTool()
+
+    def _dynamic_suffix(
+        self,
+        problem_text: str,
+        route: str,
+        difficulty: str,
+        tools_allowed: List[str],
+        rag_context: Optional[List[str]]
+    ) -> str:
+
+        context = "\n".join(rag_context) if rag_context else "No external context provided."
+
+        return _SOLVER_SUFFIX_TMPL.format_map({
+            "route": route,
+            "difficulty": difficulty,
+            "tools_allowed": list(tools_allowed),
+            "problem_text": problem_text,
+            "context": context
+        })
+
     def solve(
         self,
         problem_text: str,
@@ -102,17 +142,13 @@ EXACT OUTPUT FORMAT
         difficulty: str,
         tools_allowed: List[str],
         rag_context: Optional[List[str]] = None
-    ) -> Dict[str, Any]:
+    ) -> Mapping[str, Any]:
 
         # Hard stop: unsupported domain
         if route == "out_of_scope":
-            return {
-                "status": "CANDIDATE_FAILED",
-                "error": "Problem out of supported scope",
-                "solution": None
-            }
+            return self._OOS_RESPONSE
 
-        prompt = self._create_prompt(
+        suffix = self._dynamic_suffix(
             problem_text,
             route,
             difficulty,
@@ -120,69 +156,111 @@ EXACT OUTPUT FORMAT
             rag_context
         )
 
-        llm_response = self.llm.generate(prompt, temperature=0.2)
+        llm_response = self.llm.generate(
+            prefix_id=_SOLVER_PREFIX_ID,
+            suffix=suffix,
+            temperature=0.2
+        )
+        return self._parse_response(llm_response, tools_allowed)
+
+    async def asolve(
+        self,
+        problem_text: str,
+        route: str,
+        difficulty: str,
+        tools_allowed: List[str],
+        rag_context: Optional[List[str]] = None
+    ) -> Mapping[str, Any]:
+        """
+        Async variant of solve() so independent problems can be
+        fanned out with asyncio.gather.
+        """
+
+        # Hard stop: unsupported domain
+        if route == "out_of_scope":
+            return self._OOS_RESPONSE
+
+        suffix = self._dynamic_suffix(
+            problem_text,
+            route,
+            difficulty,
+            tools_allowed,
+            rag_context
+        )
+
+        llm_response = await self.llm.agenerate(
+            prefix_id=_SOLVER_PREFIX_ID,
+            suffix=suffix,
+            temperature=0.2
+        )
+        return self._parse_response(llm_response, tools_allowed)
+
+    # --------------------------------------------------
+    # RESPONSE VALIDATION
+    # --------------------------------------------------
+
+    def _parse_response(
+        self,
+        llm_response: Dict[str, Any],
+        tools_allowed: List[str]
+    ) -> Dict[str, Any]:
+        """
+        Checks run cheapest / most-frequent-failure first:
+        structure -> required keys -> tool authorization -> types.
+        """
 
         if not llm_response.get("success"):
-            return {
-                "status": "CANDIDATE_FAILED",
-                "error": llm_response.get("error", "LLM call failed"),
-                "solution": None
-            }
+            return self._fail(llm_response.get("error") or "LLM call failed")
 
         solution = llm_response.get("parsed_json")
 
         if not isinstance(solution, dict):
-            return {
-                "status": "CANDIDATE_FAILED",
-                "error": "LLM did not return valid JSON",
-                "solution": None
-            }
+            return self._fail("LLM did not return valid JSON")
 
         # Required keys check
-        for key in ("final_answer", "steps", "tool_requests"):
-            if key not in solution:
-                return {
-                    "status": "CANDIDATE_FAILED",
-                    "error": f"Missing required key: {key}",
-                    "solution": None
-                }
-
-        # Normalize steps
+        missing = _REQUIRED_KEYS - solution.keys()
+        if missing:
+            return self._fail(f"Missing required key: {min(missing)}")
+
+        # Tool validation (hallucinated tools are the common failure)
+        requested = solution["tool_requests"] or ()
+        try:
+            unauthorized = set(requested) - frozenset(tools_allowed)
+        except TypeError:
+            return self._fail("tool_requests must be a list of tool names")
+
+        if unauthorized:
+            tool = next(t for t in requested if t in unauthorized)
+            return self._fail(f"Unauthorized tool request: {tool}")
+
+        # Type checks
         steps = solution["steps"]
         if isinstance(steps, str):
-            steps = [s.strip() for s in steps.split("\n") if s.strip()]
+            steps = _STEP_LINE_RE.findall(steps)
 
         if not isinstance(steps, list):
-            return {
-                "status": "CANDIDATE_FAILED",
-                "error": "Steps must be a list",
-                "solution": None
-            }
+            return self._fail("Steps must be a list")
 
         final_answer = solution["final_answer"]
         if not isinstance(final_answer, str):
-            return {
-                "status": "CANDIDATE_FAILED",
-                "error": "Final answer must be a string",
-                "solution": None
-            }
-
-        # Tool validation
-        used_tools = []
-        for tool in solution.get("tool_requests", []):
-            if tool not in tools_allowed:
-                return {
-                    "status": "CANDIDATE_FAILED",
-                    "error": f"Unauthorized tool request: {tool}",
-                    "solution": None
-                }
-            used_tools.append(tool)
+            return self._fail("Final answer must be a string")
 
         return {
             "status": "CANDIDATE_GENERATED",
             "solution": {
                 "final_answer": final_answer.strip(),
                 "steps": steps,
-                "used_tools": used_tools
+                "used_tools": list(requested)
             }
         }
+
+    # --------------------------------------------------
+    # FAIL CLOSED
+    # --------------------------------------------------
+
+    def _fail(self, reason: str) -> Dict[str, Any]:
+        return {
+            "status": "CANDIDATE_FAILED",
+            "error": reason,
+            "solution": None
+        }
@@ -1,4 +1,130 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from functools import lru_cache
+import hashlib
+
+# Static prompt module, shared by every verification call
+_VERIFIER_STATIC_PREFIX = """
+You are a Verifier Agent.
+
+Your ONLY task is to evaluate whether the proposed solution is correct.
+
+STRICT RULES:
+- DO NOT solve the problem.
+- DO NOT suggest fixes or alternatives.
+- DO NOT add steps.
+- DO NOT rewrite reasoning.
+- Only judge correctness and uncertainty.
+
+EVALUATION CRITERIA:
+- Logical correctness of each step
+- Correct use of definitions, formulas, and constraints
+- Consistency between steps and final answer
+- Domain validity (no illegal operations)
+
+OUTPUT FORMAT (STRICT JSON ONLY):
+{
+  "verdict": "correct | incorrect | uncertain",
+  "confidence": 0.0,
+  "issues": [
+    "Step-referenced, concise issues only"
+  ]
+}
+
+IMPORTANT:
+- confidence MUST be between 0.0 and 1.0
+- If unsure, use verdict = "uncertain"
+- If incorrect, list the exact step(s) involved
+- No text outside JSON
+"""
+
+# Dynamic tail, appended after the cached static prefix
+_VERIFIER_SUFFIX_TMPL = """
+PROBLEM ROUTE:
+{route}
+
+PROBLEM:
+{problem_text}
+
+PROPOSED STEPS:
+{steps_text}
+
+FINAL ANSWER:
+{final_answer}
+
+SCOPE:
+{scope}
+"""
+
+_VERIFIER_PREFIX_ID = "verifier_v1"
+
+# (step cache key, steps, generate() kwargs) of a pending verifier call
+_Call = Tuple[str, List[str], Dict[str, Any]]
+
+# "1. step" formatter, bound once
+_STEP_FMT = "{0[0]}. {0[1]}".format
+
+
+@lru_cache(maxsize=256)
+def _format_steps(steps: Tuple[str, ...]) -> str:
+    """
+    Numbered step list, memoized on the steps themselves, so a
+    corrected step list is never served stale text.
+    """
+    return "\n".join(map(_STEP_FMT, enumerate(steps, 1)))
+
+_FULL_SCOPE = "Check every step and the final answer."
+_PREFIX_SCOPE = (
+    "Steps 1-{k} were already verified for this exact problem "
+    "(prefix {digest}). Treat them as correct context. Check ONLY "
+    "steps after step {k} and the final answer."
+)
+
+_VALID_VERDICTS = frozenset(("correct", "incorrect", "uncertain"))
+
+
+class StepCache:
+    """
+    Step lists of verified solutions, keyed by route and problem text
+    (whitespace-normalized only).
+
+    A re-solve of the same problem whose leading steps match the
+    verified solution only needs its tail re-checked. Problems that
+    differ in any character, numbers included, never share steps:
+    "x = 5" is a correct step for "2x + 3 = 13" and not for
+    "2x + 3 = 7".
+    """
+
+    def __init__(self, max_problems: int = 1024):
+        self.max_problems = max_problems
+        self._steps: "OrderedDict[str, List[str]]" = OrderedDict()
+
+    @staticmethod
+    def problem_key(route: str, problem_text: str) -> str:
+        return f"{route}:{' '.join(problem_text.split())}"
+
+    def verified_prefix(self, key: str, steps: List[str]) -> int:
+        """
+        Number of leading steps identical to the verified solution.
+        """
+        cached = self._steps.get(key)
+        if not cached:
+            return 0
+        self._steps.move_to_end(key)
+        matcher = SequenceMatcher(None, cached, steps, autojunk=False)
+        first = matcher.get_matching_blocks()[0]
+        return first.size if first.a == first.b == 0 else 0
+
+    def store(self, key: str, steps: List[str]) -> None:
+        self._steps[key] = steps
+        self._steps.move_to_end(key)
+        if len(self._steps) > self.max_problems:
+            self._steps.popitem(last=False)
+
+
+def _prefix_digest(steps: List[str]) -> str:
+    return hashlib.blake2b("\n".join(steps).encode(), digest_size=6).hexdigest()
 
 
 class VerifierAgent:
@@ -19,93 +145,123 @@ class VerifierAgent:
     def __init__(self, llm, confidence_threshold: float = 0.85):
         self.llm = llm
         self.confidence_threshold = confidence_threshold
+        self.step_cache = StepCache()
+        self.llm.register_cached_prefix(_VERIFIER_PREFIX_ID, _VERIFIER_STATIC_PREFIX)
 
     # --------------------------------------------------
     # PROMPT
     # --------------------------------------------------
 
-    def _create_prompt(
+    def _dynamic_suffix(
         self,
         problem_text: str,
         solution: Dict[str, Any],
-        route: str
+        route: str,
+        verified_prefix: int = 0
     ) -> str:
 
         steps = solution.get("steps", [])
+        steps_text = _format_steps(tuple(map(str, steps)))
+
+        scope = _FULL_SCOPE
+        if verified_prefix:
+            scope = _PREFIX_SCOPE.format(
+                k=verified_prefix,
+                digest=_prefix_digest(steps[:verified_prefix])
+            )
+
+        return _VERIFIER_SUFFIX_TMPL.format_map({
+            "route": route,
+            "problem_text": problem_text,
+            "steps_text": steps_text,
+            "final_answer": solution.get("final_answer", ""),
+            "scope": scope
+        })
 
-        steps_text = "\n".join(
-            f"{i+1}. {step}" for i, step in enumerate(steps)
-        )
-
-        return f"""
-You are a Verifier Agent.
+    # --------------------------------------------------
+    # VERIFICATION
+    # --------------------------------------------------
 
-Your ONLY task is to evaluate whether the proposed solution is correct.
+    def _prepare(
+        self,
+        problem_text: str,
+        solution: Dict[str, Any],
+        route: str
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[_Call]]:
+        """
+        Shared front half of verify() / averify(): structure checks
+        and prompt. Returns (failure, None) for an invalid solution,
+        else (None, (step cache key, steps, generate() kwargs)).
+        """
 
-STRICT RULES:
-- DO NOT solve the problem.
-- DO NOT suggest fixes or alternatives.
-- DO NOT add steps.
-- DO NOT rewrite reasoning.
-- Only judge correctness and uncertainty.
+        # 🚨 Hard validation: solution structure
+        if not isinstance(solution, dict):
+            return self._fail_closed("Invalid solution structure"), None
 
-EVALUATION CRITERIA:
-- Logical correctness of each step
-- Correct use of definitions, formulas, and constraints
-- Consistency between steps and final answer
-- Domain validity (no illegal operations)
+        if not isinstance(solution.get("final_answer"), str):
+            return self._fail_closed("Missing or invalid final_answer"), None
 
-PROBLEM ROUTE:
-{route}
+        if not isinstance(solution.get("steps"), list):
+            return self._fail_closed("Missing or invalid steps"), None
 
-PROBLEM:
-{problem_text}
+        steps = [str(step) for step in solution["steps"]]
+        key = self.step_cache.problem_key(route, problem_text)
 
-PROPOSED STEPS:
-{steps_text}
+        return None, (key, steps, {
+            "prefix_id": _VERIFIER_PREFIX_ID,
+            "suffix": self._dynamic_suffix(
+                problem_text, solution, route,
+                self.step_cache.verified_prefix(key, steps)
+            ),
+            "temperature": 0.1,
+            "stream_json": True
+        })
 
-FINAL ANSWER:
-{solution.get("final_answer", "")}
-
-OUTPUT FORMAT (STRICT JSON ONLY):
-{{
-  "verdict": "correct | incorrect | uncertain",
-  "confidence": 0.0,
-  "issues": [
-    "Step-referenced, concise issues only"
-  ]
-}}
+    def verify(
+        self,
+        problem_text: str,
+        solution: Dict[str, Any],
+        route: str
+    ) -> Dict[str, Any]:
 
-IMPORTANT:
-- confidence MUST be between 0.0 and 1.0
-- If unsure, use verdict = "uncertain"
-- If incorrect, list the exact step(s) involved
-- No text outside JSON
-"""
+        failure, call = self._prepare(problem_text, solution, route)
+        if failure is not None:
+            return failure
 
-    # --------------------------------------------------
-    # VERIFICATION
-    # --------------------------------------------------
+        key, steps, request = call
+        response = self.llm.generate(**request)
+        return self._remember(key, steps, self._parse_response(response))
 
-    def verify(
+    async def averify(
         self,
         problem_text: str,
         solution: Dict[str, Any],
         route: str
     ) -> Dict[str, Any]:
+        """
+        Async variant of verify(); same fail-closed contract.
+        """
 
-        # 🚨 Hard validation: solution structure
-        if not isinstance(solution, dict):
-            return self._fail_closed("Invalid solution structure")
+        failure, call = self._prepare(problem_text, solution, route)
+        if failure is not None:
+            return failure
 
-        if not isinstance(solution.get("final_answer"), str):
-            return self._fail_closed("Missing or invalid final_answer")
+        key, steps, request = call
+        response = await self.llm.agenerate(**request)
+        return self._remember(key, steps, self._parse_response(response))
 
-        if not isinstance(solution.get("steps"), list):
-            return self._fail_closed("Missing or invalid steps")
+    def _remember(
+        self,
+        key: str,
+        steps: List[str],
+        result: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        # Only confidently-correct solutions seed future prefix reuse
+        if not result["requires_hitl"]:
+            self.step_cache.store(key, steps)
+        return result
 
-        prompt = self._create_prompt(problem_text, solution, route)
-        llm_response = self.llm.generate(prompt, temperature=0.1)
+    def _parse_response(self, llm_response: Dict[str, Any]) -> Dict[str, Any]:
 
         # 🚨 LLM failure → require HITL
         if not llm_response.get("success"):
@@ -127,7 +283,7 @@ IMPORTANT:
             confidence = 0.0
 
         # Normalize verdict
-        if verdict not in {"correct", "incorrect", "uncertain"}:
+        if verdict not in _VALID_VERDICTS:
             verdict = "uncertain"
 
         # Normalize issues
@@ -0,0 +1,164 @@
+from typing import Any, Dict, Optional, Tuple
+import json
+import os
+import threading
+import time
+
+DEFAULT_TTL = 24 * 3600  # seconds
+
+
+class InMemoryHITLStore:
+    """
+    Single-process HITL store with TTL.
+    Only safe with ONE worker; use RedisHITLStore otherwise.
+    """
+
+    def __init__(self, ttl: int = DEFAULT_TTL):
+        self.ttl = ttl
+        self._records: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, hitl_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._records.get(hitl_id)
+            if item is None:
+                return None
+            expires_at, record = item
+            if expires_at < time.monotonic():
+                del self._records[hitl_id]
+                return None
+            return json.loads(json.dumps(record))
+
+    def set(
+        self,
+        hitl_id: str,
+        record: Dict[str, Any],
+        ex: Optional[int] = None
+    ) -> None:
+        # Round-trip through JSON so callers never share mutable state
+        # with the store, matching the Redis backend.
+        snapshot = json.loads(json.dumps(record))
+        with self._lock:
+            self._records[hitl_id] = (
+                time.monotonic() + (ex or self.ttl),
+                snapshot
+            )
+
+    def cas_state(
+        self,
+        hitl_id: str,
+        expected: str,
+        new: str,
+        updates: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """
+        Atomically move a record from `expected` to `new` state.
+        Returns False if the record is missing or in another state.
+        """
+        with self._lock:
+            item = self._records.get(hitl_id)
+            if item is None or item[0] < time.monotonic():
+                return False
+            expires_at, record = item
+            if record.get("state") != expected:
+                return False
+            record.update(json.loads(json.dumps(updates or {})))
+            record["state"] = new
+            return True
+
+    def purge_expired(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            for hitl_id in [k for k, (exp, _) in self._records.items() if exp < now]:
+                del self._records[hitl_id]
+
+
+class RedisHITLStore:
+    """
+    HITL store shared across workers. Requires the optional `redis` package.
+    State transitions use WATCH/MULTI/EXEC to prevent double resolution.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        ttl: int = DEFAULT_TTL,
+        namespace: str = "hitl:"
+    ):
+        import redis
+
+        self._redis = redis
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.namespace = namespace
+
+    def get(self, hitl_id: str) -> Optional[Dict[str, Any]]:
+        raw = self.client.get(self.namespace + hitl_id)
+        return json.loads(raw) if raw else None
+
+    def set(
+        self,
+        hitl_id: str,
+        record: Dict[str, Any],
+        ex: Optional[int] = None
+    ) -> None:
+        self.client.set(
+            self.namespace + hitl_id,
+            json.dumps(record),
+            ex=ex or self.ttl
+        )
+
+    def cas_state(
+        self,
+        hitl_id: str,
+        expected: str,
+        new: str,
+        updates: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        key = self.namespace + hitl_id
+
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    raw = pipe.get(key)
+                    if raw is None:
+                        return False
+
+                    record = json.loads(raw)
+                    if record.get("state") != expected:
+                        return False
+
+                    record.update(updates or {})
+                    record["state"] = new
+                    ttl = pipe.ttl(key)
+
+                    pipe.multi()
+                    pipe.set(key, json.dumps(record), ex=ttl if ttl > 0 else self.ttl)
+                    pipe.execute()
+                    return True
+
+                except self._redis.WatchError:
+                    # Another worker touched the record; re-check its state
+                    continue
+
+    def purge_expired(self) -> None:
+        # Redis expires keys itself
+        pass
+
+
+def create_hitl_store():
+    """
+    Redis when REDIS_URL is set, otherwise in-process.
+
+    An in-process store is per worker, so a /hitl/resolve landing on
+    another worker would not find the record; with WEB_CONCURRENCY > 1
+    (read by uvicorn and gunicorn) REDIS_URL is required.
+    """
+    ttl = int(os.environ.get("HITL_TTL", DEFAULT_TTL))
+    redis_url = os.environ.get("REDIS_URL")
+    if redis_url:
+        return RedisHITLStore(redis_url, ttl=ttl)
+    if int(os.environ.get("WEB_CONCURRENCY", 1)) > 1:
+        raise RuntimeError("REDIS_URL is required when WEB_CONCURRENCY > 1")
+    return InMemoryHITLStore(ttl=ttl)
@@ -0,0 +1,97 @@
+from typing import Any, Dict, List, Optional, Set, Tuple
+from functools import partial
+import asyncio
+
+
+class BatchingClient:
+    """
+    Coalesces concurrent agenerate() calls into batches.
+
+    Calls arriving within max_wait of each other are dispatched
+    together, and at most max_batch calls are in flight at once, so a
+    burst of /solve requests shares the pooled HTTP/2 connection
+    instead of stampeding it. Each caller is resumed as soon as its
+    own call finishes; a slow call does not hold back the rest of its
+    batch, and new calls are collected while a batch is in flight.
+
+    Chat-completion APIs take one conversation per request, so a batch
+    is N concurrent requests, not one multi-prompt request.
+    Everything else is delegated to the wrapped client.
+    """
+
+    def __init__(self, client, max_batch: int = 16, max_wait: float = 0.025):
+        self.client = client
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._worker: Optional[asyncio.Task] = None
+        # Strong references; the loop only keeps weak ones to tasks
+        self._tasks: Set[asyncio.Task] = set()
+
+    def __getattr__(self, name: str) -> Any:
+        # generate(), register_cached_prefix(), healthcheck(), ...
+        return getattr(self.client, name)
+
+    async def agenerate(self, **kwargs) -> Dict[str, Any]:
+        future = asyncio.get_running_loop().create_future()
+        self._ensure_worker().put_nowait((kwargs, future))
+        return await future
+
+    # --------------------------------------------------
+    # DISPATCH
+    # --------------------------------------------------
+
+    def _ensure_worker(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_batch)
+            self._worker = loop.create_task(self._drain())
+        return self._queue
+
+    async def _drain(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch: List[Tuple[Dict[str, Any], asyncio.Future]] = [
+                await self._queue.get()
+            ]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            for kwargs, future in batch:
+                if future.cancelled():
+                    continue
+                # Waits only when max_batch calls are already in flight
+                await self._slots.acquire()
+                task = loop.create_task(self.client.agenerate(**kwargs))
+                self._tasks.add(task)
+                task.add_done_callback(partial(self._settle, future))
+                future.add_done_callback(partial(self._abandon, task))
+
+    def _settle(self, future: asyncio.Future, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        self._slots.release()
+        if future.done():
+            return
+        if task.cancelled():
+            future.cancel()
+        elif task.exception() is not None:
+            future.set_exception(task.exception())
+        else:
+            future.set_result(task.result())
+
+    @staticmethod
+    def _abandon(task: asyncio.Task, future: asyncio.Future) -> None:
+        # The caller went away; stop its provider call
+        if future.cancelled():
+            task.cancel()
@@ -0,0 +1,171 @@
+from typing import Any, Callable, Dict, List, Optional, Protocol
+from collections import OrderedDict
+from dataclasses import dataclass
+import hashlib
+import math
+import threading
+import time
+import orjson
+
+
+@dataclass
+class CacheEntry:
+    value: Dict[str, Any]
+    expires_at: float
+
+
+class CacheBackend(Protocol):
+    def get(self, key: str) -> Optional[Dict[str, Any]]: ...
+
+    def set(self, key: str, value: Dict[str, Any], ttl: int) -> None: ...
+
+
+class InMemoryBackend:
+    """
+    Process-local LRU with per-entry TTL.
+    """
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry.value
+
+    def set(self, key: str, value: Dict[str, Any], ttl: int) -> None:
+        with self._lock:
+            self._entries[key] = CacheEntry(value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class RedisBackend:
+    """
+    Shared store across workers. Requires the optional `redis` package.
+    """
+
+    def __init__(self, url: str, namespace: str = "llm_cache:"):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.namespace = namespace
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = self.client.get(self.namespace + key)
+        return orjson.loads(raw) if raw else None
+
+    def set(self, key: str, value: Dict[str, Any], ttl: int) -> None:
+        self.client.set(self.namespace + key, orjson.dumps(value), ex=ttl)
+
+
+class LLMCache:
+    """
+    Response cache for near-deterministic LLM calls.
+
+    Tiers:
+    1. Exact: sha256(model, prompt, temperature, response_format)
+    2. Semantic (optional): cosine similarity of prompt embeddings,
+       enabled by passing embed_fn
+
+    Only successful responses at temperature <= max_temperature
+    are cached. Backend errors never fail the LLM call.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[CacheBackend] = None,
+        ttl: int = 3600,
+        max_temperature: float = 0.1,
+        embed_fn: Optional[Callable[[str], List[float]]] = None,
+        similarity_threshold: float = 0.92,
+        max_semantic_entries: int = 1024
+    ):
+        self.backend = backend or InMemoryBackend()
+        self.ttl = ttl
+        self.max_temperature = max_temperature
+        self.embed_fn = embed_fn
+        self.similarity_threshold = similarity_threshold
+        self.max_semantic_entries = max_semantic_entries
+        self._embeddings: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def cacheable(self, temperature: float) -> bool:
+        return temperature <= self.max_temperature
+
+    def make_key(
+        self,
+        model: str,
+        prompt: str,
+        temperature: float,
+        response_format: Optional[str] = None
+    ) -> str:
+        payload = orjson.dumps({
+            "model": model,
+            "prompt": prompt,
+            "temperature": temperature,
+            "response_format": response_format
+        }, option=orjson.OPT_SORT_KEYS)
+        return hashlib.sha256(payload).hexdigest()
+
+    def get(self, key: str, prompt: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        try:
+            hit = self.backend.get(key)
+            if hit is None and self.embed_fn is not None and prompt:
+                similar = self._nearest(self.embed_fn(prompt))
+                if similar is not None:
+                    hit = self.backend.get(similar)
+        except Exception:
+            return None
+        return dict(hit) if hit is not None else None
+
+    def set(
+        self,
+        key: str,
+        value: Dict[str, Any],
+        prompt: Optional[str] = None
+    ) -> None:
+        # Every caller parses JSON: a reply that did not parse would
+        # be replayed as a failure until the TTL runs out
+        if not value.get("success") or value.get("parsed_json") is None:
+            return
+        try:
+            self.backend.set(key, value, self.ttl)
+            if self.embed_fn is not None and prompt:
+                embedding = self.embed_fn(prompt)
+                with self._lock:
+                    self._embeddings[key] = embedding
+                    if len(self._embeddings) > self.max_semantic_entries:
+                        self._embeddings.popitem(last=False)
+        except Exception:
+            pass
+
+    # --------------------------------------------------
+    # SEMANTIC TIER
+    # --------------------------------------------------
+
+    def _nearest(self, embedding: List[float]) -> Optional[str]:
+        with self._lock:
+            candidates = list(self._embeddings.items())
+
+        best_key, best_score = None, self.similarity_threshold
+        for key, other in candidates:
+            score = _cosine(embedding, other)
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
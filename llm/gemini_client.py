@@ -1,8 +1,23 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 import os
-import json
+import httpx
 from dotenv import load_dotenv
 from google import genai
+from google.genai import errors
+
+from llm.cache import LLMCache
+from llm.http import shared_client, shared_async_client
+from llm.parsing import parse_json
+from llm.resilience import Resilience
+from llm.streaming import JsonObjectScanner
+
+_TRANSIENT_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+def _is_transient(e: BaseException) -> bool:
+    if isinstance(e, errors.APIError):
+        return e.code in _TRANSIENT_CODES
+    return isinstance(e, httpx.TransportError)  # timeouts, dropped connections
 
 
 class GeminiClient:
@@ -17,46 +32,219 @@ class GeminiClient:
     }
     """
 
-    def __init__(self, model_name: str = "gemini-1.5-pro"):
+    def __init__(
+        self,
+        model_name: str = "gemini-1.5-pro",
+        cache: Optional[LLMCache] = None
+    ):
         load_dotenv()
         api_key = os.getenv("GOOGLE_API_KEY")
 
         if not api_key:
             raise EnvironmentError("GOOGLE_API_KEY not set")
 
-        self.client = genai.Client(api_key=api_key)
+        self.client = genai.Client(
+            api_key=api_key,
+            http_options={
+                "httpx_client": shared_client(),
+                "httpx_async_client": shared_async_client()
+            }
+        )
         self.model_name = model_name
+        self._prefixes: Dict[str, str] = {}
+        self.cache = cache
+        self.resilience = Resilience(_is_transient)
+
+    def register_cached_prefix(self, prefix_id: str, prefix: str) -> None:
+        """
+        Register a static prompt prefix once. Calls that pass prefix_id
+        send the identical prefix first, so the provider's implicit
+        prompt cache can reuse it across requests.
+        """
+        self._prefixes[prefix_id] = prefix
+
+    def healthcheck(self, timeout_ms: int = 2000) -> bool:
+        """
+        Cheap reachability check: a model metadata lookup,
+        not a billable generation.
+        """
+        try:
+            self.client.models.get(
+                model=self.model_name,
+                config={"http_options": {"timeout": timeout_ms}}
+            )
+            return True
+        except Exception:
+            return False
 
-    def generate(self, prompt: str, temperature: float = 0.2) -> Dict[str, Any]:
+    def generate(
+        self,
+        prompt: str = "",
+        temperature: float = 0.2,
+        prefix_id: Optional[str] = None,
+        suffix: str = "",
+        response_format: Optional[str] = None,
+        stream_json: bool = False
+    ) -> Dict[str, Any]:
         try:
-            response = self.client.models.generate_content(
+            prompt = self._resolve_prompt(prompt, prefix_id, suffix)
+            key, hit = self._cache_lookup(prompt, temperature, response_format)
+            if hit is not None:
+                return hit
+
+            if stream_json:
+                text = self.resilience.call(
+                    self._stream_json, prompt, temperature, response_format
+                )
+                return self._cache_store(key, prompt, self._text_result(text))
+
+            response = self.resilience.call(
+                self.client.models.generate_content,
                 model=self.model_name,
                 contents=prompt,
-                config={
-                    "temperature": temperature,
-                    "max_output_tokens": 2048
-                }
+                config=self._config(temperature, response_format)
             )
+            return self._cache_store(key, prompt, self._to_result(response))
 
-            text = response.text.strip() if response.text else ""
+        except Exception as e:
+            return self._error(e)
 
-            parsed_json = None
-            try:
-                parsed_json = json.loads(text)
-            except (json.JSONDecodeError, AttributeError):
-                pass
+    async def agenerate(
+        self,
+        prompt: str = "",
+        temperature: float = 0.2,
+        prefix_id: Optional[str] = None,
+        suffix: str = "",
+        response_format: Optional[str] = None,
+        stream_json: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Async variant of generate() on the SDK's native aio client.
+        Same contract.
 
-            return {
-                "success": True,
-                "content": text,
-                "parsed_json": parsed_json,
-                "error": None
-            }
+        stream_json: stream the response and stop reading as soon as
+        the first top-level JSON object is complete.
+        """
+        try:
+            prompt = self._resolve_prompt(prompt, prefix_id, suffix)
+            key, hit = self._cache_lookup(prompt, temperature, response_format)
+            if hit is not None:
+                return hit
+
+            if stream_json:
+                text = await self.resilience.acall(
+                    self._astream_json, prompt, temperature, response_format
+                )
+                return self._cache_store(key, prompt, self._text_result(text))
+
+            response = await self.resilience.acall(
+                self.client.aio.models.generate_content,
+                model=self.model_name,
+                contents=prompt,
+                config=self._config(temperature, response_format)
+            )
+            return self._cache_store(key, prompt, self._to_result(response))
 
         except Exception as e:
-            return {
-                "success": False,
-                "content": "",
-                "parsed_json": None,
-                "error": f"Gemini API error: {str(e)[:200]}"
-            }
+            return self._error(e)
+
+    # --------------------------------------------------
+    # HELPERS
+    # --------------------------------------------------
+
+    def _cache_lookup(
+        self,
+        prompt: str,
+        temperature: float,
+        response_format: Optional[str]
+    ) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        if self.cache is None or not self.cache.cacheable(temperature):
+            return None, None
+        key = self.cache.make_key(self.model_name, prompt, temperature, response_format)
+        return key, self.cache.get(key, prompt)
+
+    def _cache_store(
+        self,
+        key: Optional[str],
+        prompt: str,
+        result: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        if key is not None:
+            self.cache.set(key, result, prompt)
+        return result
+
+    def _resolve_prompt(
+        self,
+        prompt: str,
+        prefix_id: Optional[str],
+        suffix: str
+    ) -> str:
+        if prefix_id is not None:
+            return self._prefixes[prefix_id] + suffix
+        return prompt
+
+    def _config(
+        self,
+        temperature: float,
+        response_format: Optional[str]
+    ) -> Dict[str, Any]:
+        config = {
+            "temperature": temperature,
+            "max_output_tokens": 2048
+        }
+        if response_format == "json_object":
+            config["response_mime_type"] = "application/json"
+        return config
+
+    def _stream_json(
+        self,
+        prompt: str,
+        temperature: float,
+        response_format: Optional[str]
+    ) -> str:
+        scanner = JsonObjectScanner()
+        for chunk in self.client.models.generate_content_stream(
+            model=self.model_name,
+            contents=prompt,
+            config=self._config(temperature, response_format)
+        ):
+            if scanner.feed(chunk.text or ""):
+                break
+        return scanner.text()
+
+    async def _astream_json(
+        self,
+        prompt: str,
+        temperature: float,
+        response_format: Optional[str]
+    ) -> str:
+        scanner = JsonObjectScanner()
+        async for chunk in await self.client.aio.models.generate_content_stream(
+            model=self.model_name,
+            contents=prompt,
+            config=self._config(temperature, response_format)
+        ):
+            if scanner.feed(chunk.text or ""):
+                break
+        return scanner.text()
+
+    def _to_result(self, response) -> Dict[str, Any]:
+        return self._text_result(response.text or "")
+
+    def _text_result(self, text: str) -> Dict[str, Any]:
+        text = text.strip()
+
+        return {
+            "success": True,
+            "content": text,
+            "parsed_json": parse_json(text),
+            "error": None
+        }
+
+    def _error(self, e: Exception) -> Dict[str, Any]:
+        return {
+            "success": False,
+            "content": "",
+            "parsed_json": None,
+            "error": f"Gemini API error: {str(e)[:200]}"
+        }
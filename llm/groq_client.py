@@ -1,9 +1,32 @@
-from typing import Dict, Any
+from typing import Dict, Any, Mapping, Optional, Tuple
+import inspect
 import os
-import json
-from groq import Groq
+import groq
+from groq import Groq, AsyncGroq
 from dotenv import load_dotenv
 
+from llm.cache import LLMCache
+from llm.http import shared_client, shared_async_client
+from llm.parsing import parse_json
+from llm.rate_limiter import AsyncTokenBucket
+from llm.resilience import Resilience
+from llm.streaming import JsonObjectScanner
+
+_MAX_TOKENS = 2048
+
+# Quotas until the first response reports the real token limit
+# (Groq free tier, 70B models)
+_DEFAULT_RPM = 30
+_DEFAULT_TPM = 12000
+
+
+def _is_transient(e: BaseException) -> bool:
+    return isinstance(e, (
+        groq.RateLimitError,
+        groq.APIConnectionError,  # includes APITimeoutError
+        groq.InternalServerError
+    ))
+
 
 class GroqClient:
     """
@@ -17,51 +40,263 @@ class GroqClient:
     }
     """
 
-    def __init__(self, model_name: str = "llama-3.3-70b-versatile"):
+    def __init__(
+        self,
+        model_name: str = "llama-3.3-70b-versatile",
+        cache: Optional[LLMCache] = None
+    ):
         load_dotenv()
         api_key = os.getenv("GROQ_API_KEY")
 
         if not api_key:
             raise EnvironmentError("GROQ_API_KEY environment variable is not set")
 
-        self.client = Groq(api_key=api_key)
+        # SDK retries are off: Resilience owns retry and backoff
+        self.client = Groq(
+            api_key=api_key, http_client=shared_client(), max_retries=0
+        )
+        self.async_client = AsyncGroq(
+            api_key=api_key, http_client=shared_async_client(), max_retries=0
+        )
         self.model_name = model_name
+        self._prefixes: Dict[str, str] = {}
+        self.cache = cache
+        self.resilience = Resilience(_is_transient)
+        self.limiter = AsyncTokenBucket(*self._rate_limits())
+        # Read from the first response's headers unless GROQ_TPM is set
+        self._tpm_known = bool(os.getenv("GROQ_TPM"))
+
+    def register_cached_prefix(self, prefix_id: str, prefix: str) -> None:
+        """
+        Register a static prompt prefix once. Calls that pass prefix_id
+        send the identical prefix first, so the provider's implicit
+        prompt cache can reuse it across requests.
+        """
+        self._prefixes[prefix_id] = prefix
 
-    def generate(self, prompt: str, temperature: float = 0.3) -> Dict[str, Any]:
+    def generate(
+        self,
+        prompt: str = "",
+        temperature: float = 0.3,
+        prefix_id: Optional[str] = None,
+        suffix: str = "",
+        response_format: Optional[str] = None,
+        stream_json: bool = False
+    ) -> Dict[str, Any]:
         try:
-            completion = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=temperature,
-                max_tokens=2048,
-                top_p=0.95,
+            prompt = self._resolve_prompt(prompt, prefix_id, suffix)
+            key, hit = self._cache_lookup(prompt, temperature, response_format)
+            if hit is not None:
+                return hit
+
+            if stream_json:
+                text = self.resilience.call(
+                    self._stream_json, prompt, temperature, response_format
+                )
+                return self._cache_store(key, prompt, self._text_result(text))
+
+            completion = self.resilience.call(
+                self.client.chat.completions.create,
+                **self._request(prompt, temperature, response_format)
             )
+            return self._cache_store(key, prompt, self._to_result(completion))
 
-            raw_text = ""
-            if completion.choices and completion.choices[0].message:
-                raw_text = completion.choices[0].message.content or ""
+        except Exception as e:
+            return self._error(e)
+
+    async def agenerate(
+        self,
+        prompt: str = "",
+        temperature: float = 0.3,
+        prefix_id: Optional[str] = None,
+        suffix: str = "",
+        response_format: Optional[str] = None,
+        stream_json: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Async variant of generate() on AsyncGroq. Same contract.
 
-            raw_text = raw_text.strip()
+        stream_json: stream the response and close the connection as
+        soon as the first top-level JSON object is complete.
+        """
+        try:
+            prompt = self._resolve_prompt(prompt, prefix_id, suffix)
+            key, hit = self._cache_lookup(prompt, temperature, response_format)
+            if hit is not None:
+                return hit
 
-            parsed_json = None
+            # Reserve the worst case up front, refund what was not used
+            reserved = len(prompt) // 4 + _MAX_TOKENS
+            used = reserved
+            await self.limiter.acquire(reserved)
             try:
-                parsed_json = json.loads(raw_text)
-            except json.JSONDecodeError:
-                pass  # Expected for many prompts
+                if stream_json:
+                    text = await self.resilience.acall(
+                        self._astream_json, prompt, temperature, response_format
+                    )
+                    used = (len(prompt) + len(text)) // 4
+                    return self._cache_store(key, prompt, self._text_result(text))
 
-            return {
-                "success": True,
-                "content": raw_text,
-                "parsed_json": parsed_json,
-                "error": None
-            }
+                completion = await self.resilience.acall(
+                    self._acreate,
+                    **self._request(prompt, temperature, response_format)
+                )
+                if completion.usage is not None:
+                    used = completion.usage.total_tokens
+                return self._cache_store(key, prompt, self._to_result(completion))
+            finally:
+                self.limiter.release(reserved - used)
 
         except Exception as e:
-            return {
-                "success": False,
-                "content": "",
-                "parsed_json": None,
-                "error": str(e)
-            }
+            return self._error(e)
+
+    # --------------------------------------------------
+    # HELPERS
+    # --------------------------------------------------
+
+    def _cache_lookup(
+        self,
+        prompt: str,
+        temperature: float,
+        response_format: Optional[str]
+    ) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        if self.cache is None or not self.cache.cacheable(temperature):
+            return None, None
+        key = self.cache.make_key(self.model_name, prompt, temperature, response_format)
+        return key, self.cache.get(key, prompt)
+
+    def _cache_store(
+        self,
+        key: Optional[str],
+        prompt: str,
+        result: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        if key is not None:
+            self.cache.set(key, result, prompt)
+        return result
+
+    def _resolve_prompt(
+        self,
+        prompt: str,
+        prefix_id: Optional[str],
+        suffix: str
+    ) -> str:
+        if prefix_id is not None:
+            return self._prefixes[prefix_id] + suffix
+        return prompt
+
+    def _rate_limits(self) -> Tuple[int, int]:
+        """
+        Initial (rpm, tpm) for the limiter: GROQ_RPM / GROQ_TPM, or the
+        free-tier defaults. No request is made here; without GROQ_TPM
+        the token limit is taken from the first response's headers.
+        Groq reports requests per day, not per minute, in those
+        headers, so rpm is never learned.
+        """
+        return (
+            int(os.getenv("GROQ_RPM", _DEFAULT_RPM)),
+            int(os.getenv("GROQ_TPM", _DEFAULT_TPM))
+        )
+
+    def _learn_tpm(self, headers: Mapping[str, str]) -> None:
+        try:
+            tpm = int(headers["x-ratelimit-limit-tokens"])
+        except (KeyError, TypeError, ValueError):
+            return
+        self._tpm_known = True
+        self.limiter.resize(tpm)
+
+    async def _acreate(self, **request):
+        if self._tpm_known:
+            return await self.async_client.chat.completions.create(**request)
+
+        raw = await self.async_client.chat.completions.with_raw_response.create(**request)
+        self._learn_tpm(raw.headers)
+        completion = raw.parse()
+        if inspect.isawaitable(completion):  # async raw responses in newer SDKs
+            completion = await completion
+        return completion
+
+    def _request(
+        self,
+        prompt: str,
+        temperature: float,
+        response_format: Optional[str]
+    ) -> Dict[str, Any]:
+        request = {
+            "model": self.model_name,
+            "messages": [
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": temperature,
+            "max_tokens": _MAX_TOKENS,
+            "top_p": 0.95,
+        }
+        if response_format:
+            request["response_format"] = {"type": response_format}
+        return request
+
+    def _stream_json(
+        self,
+        prompt: str,
+        temperature: float,
+        response_format: Optional[str]
+    ) -> str:
+        scanner = JsonObjectScanner()
+        stream = self.client.chat.completions.create(
+            **self._request(prompt, temperature, response_format),
+            stream=True
+        )
+        try:
+            for chunk in stream:
+                if chunk.choices and scanner.feed(chunk.choices[0].delta.content or ""):
+                    break
+        finally:
+            stream.close()
+        return scanner.text()
+
+    async def _astream_json(
+        self,
+        prompt: str,
+        temperature: float,
+        response_format: Optional[str]
+    ) -> str:
+        scanner = JsonObjectScanner()
+        stream = await self.async_client.chat.completions.create(
+            **self._request(prompt, temperature, response_format),
+            stream=True
+        )
+        if not self._tpm_known:
+            self._learn_tpm(stream.response.headers)
+        try:
+            async for chunk in stream:
+                if chunk.choices and scanner.feed(chunk.choices[0].delta.content or ""):
+                    break
+        finally:
+            await stream.close()
+        return scanner.text()
+
+    def _to_result(self, completion) -> Dict[str, Any]:
+        raw_text = ""
+        if completion.choices and completion.choices[0].message:
+            raw_text = completion.choices[0].message.content or ""
+
+        return self._text_result(raw_text)
+
+    def _text_result(self, raw_text: str) -> Dict[str, Any]:
+        raw_text = raw_text.strip()
+
+        return {
+            "success": True,
+            "content": raw_text,
+            "parsed_json": parse_json(raw_text),
+            "error": None
+        }
+
+    def _error(self, e: Exception) -> Dict[str, Any]:
+        return {
+            "success": False,
+            "content": "",
+            "parsed_json": None,
+            "error": str(e)
+        }
@@ -0,0 +1,36 @@
+from typing import Optional
+import threading
+import httpx
+
+# Shared across every client in the process: one pool of keep-alive
+# connections, multiplexed over HTTP/2.
+_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+_TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+
+_sync_client: Optional[httpx.Client] = None
+_async_client: Optional[httpx.AsyncClient] = None
+_lock = threading.Lock()
+
+
+def shared_client() -> httpx.Client:
+    global _sync_client
+    with _lock:
+        if _sync_client is None:
+            _sync_client = httpx.Client(
+                http2=True, limits=_LIMITS, timeout=_TIMEOUT
+            )
+        return _sync_client
+
+
+def shared_async_client() -> httpx.AsyncClient:
+    """
+    Bound to the event loop it is first used on; main.py runs all
+    async work on one long-lived loop per worker.
+    """
+    global _async_client
+    with _lock:
+        if _async_client is None:
+            _async_client = httpx.AsyncClient(
+                http2=True, limits=_LIMITS, timeout=_TIMEOUT
+            )
+        return _async_client
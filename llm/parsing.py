@@ -0,0 +1,21 @@
+from typing import Any, Optional
+import re
+import orjson
+
+# ```json ... ``` (or bare ```) wrapped around the whole response
+_FENCE_RE = re.compile(r"^```[a-zA-Z]*\s*(.*?)\s*```$", re.DOTALL)
+
+
+def parse_json(text: str) -> Optional[Any]:
+    """
+    Decode an LLM response as JSON, tolerating a markdown code fence.
+    Returns None if the text is not valid JSON.
+    """
+    match = _FENCE_RE.match(text)
+    if match:
+        text = match.group(1)
+
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        return None  # Expected for many prompts
@@ -0,0 +1,59 @@
+import asyncio
+import time
+
+
+class AsyncTokenBucket:
+    """
+    Client-side limiter for a provider's per-minute quotas.
+
+    Two buckets refill continuously: one in requests (rpm) and one in
+    tokens (tpm). acquire() waits until both can cover the call, so a
+    burst of concurrent requests is spread out at the provider's
+    ceiling instead of tripping 429s. Waiters are served in order.
+    """
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    async def acquire(self, tokens: int) -> None:
+        # A call larger than the whole bucket would never fit
+        tokens = min(tokens, self.tpm)
+
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep(max(
+                    (1 - self._requests) * 60 / self.rpm,
+                    (tokens - self._tokens) * 60 / self.tpm
+                ))
+
+    def release(self, tokens: int) -> None:
+        """
+        Return tokens reserved by acquire() but not used.
+        """
+        if tokens > 0:
+            self._tokens = min(self.tpm, self._tokens + tokens)
+
+    def resize(self, tpm: int) -> None:
+        """
+        Adopt a token quota learned after construction.
+        """
+        if tpm > 0:
+            self.tpm = tpm
+            self._tokens = min(self._tokens, float(tpm))
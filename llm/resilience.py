@@ -0,0 +1,132 @@
+from typing import Any, Callable, Optional
+import threading
+import time
+from tenacity import (
+    AsyncRetrying,
+    Retrying,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_random_exponential
+)
+
+# Upper bound on a provider-requested Retry-After, in seconds
+_MAX_RETRY_AFTER = 30.0
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing provider for reset_timeout seconds after
+    fail_max consecutive failures. Once the timeout has passed, a single
+    trial call is let through (half-open): success closes the circuit,
+    failure opens it again.
+    """
+
+    def __init__(self, fail_max: int = 5, reset_timeout: float = 30.0):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                raise CircuitOpenError("circuit open: provider failing, call skipped")
+            # Half-open: let this call through, re-open on failure
+            self._opened_at = None
+            self._failures = self.fail_max - 1
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.fail_max:
+                self._opened_at = time.monotonic()
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """
+    Seconds from the Retry-After header of a failed response, if any.
+    """
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        value = float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+    return min(max(value, 0.0), _MAX_RETRY_AFTER)
+
+
+class Resilience:
+    """
+    Retry with jittered exponential backoff, behind a circuit breaker.
+
+    Only exceptions accepted by `retryable` are retried, and only
+    those count toward opening the circuit: a bad request says nothing
+    about the provider's health. Retry-After is honored when the
+    provider sends it. An open circuit raises CircuitOpenError without
+    touching the network.
+    """
+
+    def __init__(
+        self,
+        retryable: Callable[[BaseException], bool],
+        attempts: int = 4,
+        min_wait: float = 0.5,
+        max_wait: float = 8.0,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        self.retryable = retryable
+        self.attempts = attempts
+        self.breaker = breaker or CircuitBreaker()
+        self._backoff = wait_random_exponential(min=min_wait, max=max_wait)
+
+    def _wait(self, retry_state) -> float:
+        delay = retry_after(retry_state.outcome.exception())
+        return delay if delay is not None else self._backoff(retry_state)
+
+    def _policy(self) -> dict:
+        return {
+            "retry": retry_if_exception(self.retryable),
+            "wait": self._wait,
+            "stop": stop_after_attempt(self.attempts),
+            "reraise": True
+        }
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        for attempt in Retrying(**self._policy()):
+            with attempt:
+                self.breaker.before_call()
+                try:
+                    result = fn(*args, **kwargs)
+                except Exception as e:
+                    if self.retryable(e):
+                        self.breaker.record_failure()
+                    raise
+                self.breaker.record_success()
+                return result
+
+    async def acall(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        async for attempt in AsyncRetrying(**self._policy()):
+            with attempt:
+                self.breaker.before_call()
+                try:
+                    result = await fn(*args, **kwargs)
+                except Exception as e:
+                    if self.retryable(e):
+                        self.breaker.record_failure()
+                    raise
+                self.breaker.record_success()
+                return result
@@ -0,0 +1,65 @@
+from typing import List, Optional
+
+
+class JsonObjectScanner:
+    """
+    Finds the end of the first top-level JSON object in a token stream,
+    so the caller can close the connection as soon as it is complete.
+
+    Tracks brace depth outside of JSON strings (escape-aware).
+    """
+
+    def __init__(self):
+        self._chunks: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._start: Optional[int] = None
+        self._end: Optional[int] = None
+        self._offset = 0
+
+    @property
+    def done(self) -> bool:
+        return self._end is not None
+
+    def feed(self, chunk: str) -> bool:
+        """
+        Consume one streamed chunk. Returns True once the object is complete.
+        """
+        if self.done or not chunk:
+            return self.done
+
+        self._chunks.append(chunk)
+
+        for i, ch in enumerate(chunk, self._offset):
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                if self._start is not None:
+                    self._in_string = True
+            elif ch == "{":
+                if self._start is None:
+                    self._start = i
+                self._depth += 1
+            elif ch == "}" and self._start is not None:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._end = i + 1
+                    break
+
+        self._offset += len(chunk)
+        return self.done
+
+    def text(self) -> str:
+        """
+        The complete object if one was found, else everything received.
+        """
+        full = "".join(self._chunks)
+        if self.done:
+            return full[self._start:self._end]
+        return full.strip()
@@ -1,7 +1,13 @@
+import asyncio
+import hashlib
+import inspect
 import os
+import re
+import threading
+import time
 import uuid
-from typing import Dict, Any, List
-from flask import Flask, request, jsonify
+from typing import Dict, Any, List, Mapping, Optional
+import orjson
 from dotenv import load_dotenv
 
 from agents.intent_router import IntentRouter
@@ -10,21 +16,92 @@ from agents.verifier import VerifierAgent
 from agents.explainer import ExplainerAgent
 from llm.gemini_client import GeminiClient
 from llm.groq_client import GroqClient
+from llm.batching import BatchingClient
+from llm.cache import InMemoryBackend, LLMCache, RedisBackend
 from tools.python_tool import PythonTool
+from hitl_store import create_hitl_store
 
 # --------------------------------------------------
 # ENV + APP INIT
 # --------------------------------------------------
 
 load_dotenv()
-app = Flask(__name__)
+
+# ASGI (Quart, served by uvicorn) by default.
+# USE_QUART=false falls back to the WSGI Flask app (gunicorn).
+USE_QUART = os.environ.get("USE_QUART", "true").lower() == "true"
+
+if USE_QUART:
+    from quart import Quart as WebApp, Response, request
+else:
+    from flask import Flask as WebApp, Response, request
+
+app = WebApp(__name__)
 
 CONFIDENCE_THRESHOLD = 0.85
-ALLOWED_HITL_ACTIONS = {"approve", "reject", "edit_problem", "correct_solution"}
-TERMINAL_STATES = {"RESOLVED"}
+ALLOWED_HITL_ACTIONS = frozenset({"approve", "reject", "edit_problem", "correct_solution"})
+TERMINAL_STATES = frozenset({"RESOLVED"})
+CACHEABLE_STATUSES = frozenset({"SUCCESS", "OUT_OF_SCOPE"})
+
+# Routes whose answers PythonTool can confirm without the LLM verifier
+TOOL_VERIFIABLE_ROUTES = frozenset({"algebra_equation"})
+# Seconds the SymPy check may take before the LLM verifier is used instead
+TOOL_VERIFY_TIMEOUT = float(os.environ.get("TOOL_VERIFY_TIMEOUT", 2.0))
+
+# First "lhs = rhs" span made of numbers, single-letter variables and
+# operators; words like "Solve" or "for" end the span.
+_EQ_ATOM = r"(?:\d+(?:\.\d+)?|(?<![A-Za-z])[A-Za-z](?![A-Za-z])|[ +\-*/^().])"
+_EQUATION_RE = re.compile(rf"{_EQ_ATOM}+={_EQ_ATOM}+")
+
+# What may surround that equation for the tool check to apply: a plain
+# request for its root ("Solve ...", "Find x: ...", "... for x").
+# Anything else ("If 2x = 4, what is x + 1?") goes to the LLM verifier.
+_SOLVE_ASK_RE = re.compile(
+    r"\s*(?:(?:solve|find)(?:\s+the\s+equation)?"
+    r"(?:\s+(?:for\s+)?(?P<pre>[A-Za-z]))?\s*:?)?"
+    r"\s*(?:,?\s*for\s+(?P<post>[A-Za-z]))?\s*[.?!]?\s*",
+    re.IGNORECASE
+)
+
+# HITL store: Redis when REDIS_URL is set (required for >1 worker),
+# otherwise in-process. Records expire after HITL_TTL seconds.
+HITL_STORE = create_hitl_store()
+
+# Provider probe result, shared across Gunicorn workers
+LLM_CHOICE_FILE = os.environ.get("LLM_CHOICE_FILE", "/tmp/.llm_choice")
+LLM_CHOICE_TTL = 600  # seconds
+
+
+def _same_route(a: Mapping[str, Any], b: Mapping[str, Any]) -> bool:
+    """
+    A speculative solve is reusable if route and tools match. The
+    difficulty is only the router's rough hint in the solver prompt,
+    and the candidate is verified either way, so it is not compared.
+    """
+    return (
+        a["route"] == b["route"]
+        and frozenset(a.get("tools_allowed", ())) == frozenset(b.get("tools_allowed", ()))
+    )
+
+
+def _read_provider_choice() -> Optional[str]:
+    try:
+        if time.time() - os.path.getmtime(LLM_CHOICE_FILE) > LLM_CHOICE_TTL:
+            return None
+        with open(LLM_CHOICE_FILE) as f:
+            choice = f.read().strip()
+    except OSError:
+        return None
+    return choice if choice in ("gemini", "groq") else None
+
+
+def _write_provider_choice(choice: str) -> None:
+    try:
+        with open(LLM_CHOICE_FILE, "w") as f:
+            f.write(choice)
+    except OSError:
+        pass
 
-# Temporary in-memory HITL store
-HITL_STORE: Dict[str, Dict[str, Any]] = {}
 
 # --------------------------------------------------
 # MULTI-AGENT SYSTEM
@@ -33,55 +110,149 @@ HITL_STORE: Dict[str, Dict[str, Any]] = {}
 class MultiAgentSystem:
 
     def __init__(self, llm_provider: str = "auto"):
+        # One response cache shared by every agent's LLM calls
+        redis_url = os.environ.get("REDIS_URL")
+        self.llm_cache = LLMCache(
+            backend=RedisBackend(redis_url) if redis_url else None,
+            ttl=int(os.environ.get("LLM_CACHE_TTL", 3600))
+        )
         self.llm = self._initialize_llm(llm_provider)
         self.python_tool = PythonTool()
 
+        # Single-flight: identical concurrent requests share one run;
+        # finished runs are served from a short-TTL result cache
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.result_cache = InMemoryBackend()
+        self.result_cache_ttl = int(os.environ.get("RESULT_CACHE_TTL", 60))
+
         self.intent_router = IntentRouter(self.llm)
         self.solver = SolverAgent(self.llm, self.python_tool)
-        self.verifier = VerifierAgent(self.llm)
+        # Verifier calls arrive in bursts under load; coalesce them
+        self.verifier = VerifierAgent(BatchingClient(self.llm))
         self.explainer = ExplainerAgent(self.llm)
 
     def _initialize_llm(self, provider: str):
         provider = provider.lower()
+        if provider == "auto":
+            # Sibling workers reuse the first worker's probe result
+            provider = _read_provider_choice() or "auto"
+        probing = provider == "auto"
+
         if provider in ("gemini", "auto"):
             try:
-                gemini = GeminiClient()
-                if gemini.generate("ping").get("success"):
+                gemini = GeminiClient(cache=self.llm_cache)
+                if not probing or gemini.healthcheck():
+                    if probing:
+                        _write_provider_choice("gemini")
                     return gemini
             except Exception:
                 pass
-        return GroqClient(model_name="llama-3.3-70b-versatile")
+
+        if probing:
+            _write_provider_choice("groq")
+        return GroqClient(
+            model_name="llama-3.3-70b-versatile",
+            cache=self.llm_cache
+        )
 
     # --------------------------------------------------
     # PRIMARY PIPELINE
     # --------------------------------------------------
 
-    def process_problem(self, problem_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def process_problem(self, problem_data: Dict[str, Any]) -> Dict[str, Any]:
+        key = hashlib.sha256(orjson.dumps(
+            problem_data, option=orjson.OPT_SORT_KEYS, default=str
+        )).hexdigest()
+
+        cached = self.result_cache.get(key)
+        if cached is not None:
+            return cached
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._process_problem(problem_data))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish_inflight(key, t))
+
+        # Shielded: one caller going away must not cancel the others' run
+        return await asyncio.shield(task)
+
+    def _finish_inflight(self, key: str, task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        result = task.result()
+        # HITL records are one-per-run; only replayable outcomes are cached
+        if result["status"] in CACHEABLE_STATUSES:
+            self.result_cache.set(key, result, self.result_cache_ttl)
+
+    async def _process_problem(self, problem_data: Dict[str, Any]) -> Dict[str, Any]:
         agent_trace: List[Dict[str, Any]] = []
 
-        route_info = self.intent_router.route(problem_data)
-        agent_trace.append({"agent": "IntentRouter", "output": route_info})
+        # Speculative execution: when routing needs an LLM call and the
+        # problem contains an equation, start solving it as algebra in
+        # parallel and keep the result only if the router agrees.
+        speculative = None
+        if (
+            not self.intent_router.is_trusted(problem_data)
+            and _EQUATION_RE.search(problem_data["problem_text"])
+        ):
+            speculative = asyncio.ensure_future(
+                self._solve(problem_data, IntentRouter.SPECULATIVE_ROUTE)
+            )
+
+        try:
+            route_info = await self.intent_router.aroute(problem_data)
+        except BaseException:
+            if speculative is not None:
+                speculative.cancel()
+            raise
+        agent_trace.append({"agent": "IntentRouter", "output": dict(route_info)})
+
+        if speculative is not None and not _same_route(
+            route_info, IntentRouter.SPECULATIVE_ROUTE
+        ):
+            speculative.cancel()
+            speculative = None
 
         if route_info["route"] == "out_of_scope":
             return {"status": "OUT_OF_SCOPE", "agent_trace": agent_trace}
 
-        solver_result = self.solver.solve(
-            problem_text=problem_data["problem_text"],
-            route=route_info["route"],
-            difficulty=route_info["difficulty"],
-            tools_allowed=route_info.get("tools_allowed", []),
-            rag_context=problem_data.get("retrieved_context", [])
-        )
-        agent_trace.append({"agent": "Solver", "output": solver_result})
+        if speculative is not None:
+            solver_result = await speculative
+        else:
+            solver_result = await self._solve(problem_data, route_info)
+        agent_trace.append({"agent": "Solver", "output": dict(solver_result)})
 
-        if solver_result.get("status") != "SOLVED":
+        if solver_result.get("status") != "CANDIDATE_GENERATED":
             return {"status": "FAILED", "agent_trace": agent_trace}
 
-        verification = self.verifier.verify(
-            problem_text=problem_data["problem_text"],
-            solution=solver_result,
-            route=route_info["route"]
+        solution = solver_result["solution"]
+
+        # The explanation depends only on the solver output, so it runs
+        # alongside verification and is discarded if HITL is required.
+        explain_task = asyncio.create_task(
+            self.explainer.aexplain(
+                problem_text=problem_data["problem_text"],
+                verified_solution=solution
+            )
         )
+
+        verification = None
+        try:
+            if route_info["route"] in TOOL_VERIFIABLE_ROUTES:
+                verification = await self._tool_verify(
+                    problem_data["problem_text"], solution
+                )
+            if verification is None:
+                verification = await self.verifier.averify(
+                    problem_text=problem_data["problem_text"],
+                    solution=solution,
+                    route=route_info["route"]
+                )
+        except BaseException:
+            explain_task.cancel()
+            raise
         agent_trace.append({"agent": "Verifier", "output": verification})
 
         if (
@@ -89,12 +260,13 @@ class MultiAgentSystem:
             or verification.get("confidence", 0.0) < CONFIDENCE_THRESHOLD
             or verification.get("requires_hitl", False)
         ):
+            explain_task.cancel()
             hitl_id = str(uuid.uuid4())
 
-            HITL_STORE[hitl_id] = {
+            hitl_record = {
                 "state": "PENDING_REVIEW",
                 "problem_data": problem_data,
-                "solution": solver_result,
+                "solution": solution,
                 "verification": verification,
                 "agent_trace": agent_trace,
                 "hitl_reason": {
@@ -103,33 +275,101 @@ class MultiAgentSystem:
                     "requires_hitl": verification.get("requires_hitl", False)
                 }
             }
+            HITL_STORE.set(hitl_id, hitl_record)
 
             return {
                 "status": "HITL_REQUIRED",
                 "hitl_request_id": hitl_id,
-                "hitl_reason": HITL_STORE[hitl_id]["hitl_reason"]
+                "hitl_reason": hitl_record["hitl_reason"]
             }
 
-        explanation = self.explainer.explain(
-            problem_text=problem_data["problem_text"],
-            verified_solution=solver_result,
-            verification_confidence=verification["confidence"]
-        )
+        explanation = await explain_task
 
         return {
             "status": "SUCCESS",
-            "final_answer": solver_result["final_answer"],
-            "steps": solver_result["steps"],
+            "final_answer": solution["final_answer"],
+            "steps": solution["steps"],
             "explanation": explanation,
             "confidence": verification["confidence"],
             "agent_trace": agent_trace
         }
 
+    async def _solve(
+        self,
+        problem_data: Dict[str, Any],
+        route_info: Mapping[str, Any]
+    ) -> Mapping[str, Any]:
+        return await self.solver.asolve(
+            problem_text=problem_data["problem_text"],
+            route=route_info["route"],
+            difficulty=route_info["difficulty"],
+            tools_allowed=route_info.get("tools_allowed", []),
+            rag_context=problem_data.get("retrieved_context", [])
+        )
+
+    async def _tool_verify(
+        self,
+        problem_text: str,
+        solution: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Deterministic check for single-equation problems.
+        Returns a verdict only when the answer is CONFIRMED;
+        anything else falls through to the LLM verifier.
+        """
+        # Exactly one equation, and the question asks for its root
+        equations = _EQUATION_RE.findall(problem_text)
+        if len(equations) != 1:
+            return None
+        ask = _SOLVE_ASK_RE.fullmatch(problem_text.replace(equations[0], " ", 1))
+        if ask is None:
+            return None
+        equation = equations[0].rstrip(" .")
+
+        # simplify/solve are synchronous and can be slow; keep them off
+        # the event loop. verify() rejects oversized numbers before
+        # SymPy can evaluate them in one GIL-holding call, so the rest
+        # of its work yields and the timeout holds. A timed-out thread
+        # runs on but is ignored.
+        try:
+            check = await asyncio.wait_for(
+                asyncio.to_thread(
+                    self.python_tool.verify,
+                    equation,
+                    solution["final_answer"],
+                    ask.group("pre") or ask.group("post")
+                ),
+                TOOL_VERIFY_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            return None
+        if not (check["success"] and check["result"]):
+            return None
+
+        return {
+            "verdict": "correct",
+            "confidence": 1.0,
+            "issues": [],
+            "requires_hitl": False,
+            "checked_by": "python_tool"
+        }
+
+    async def process_batch(
+        self,
+        problems: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Runs independent problems concurrently.
+        """
+        return list(await asyncio.gather(
+            *(self.process_problem(p) for p in problems)
+        ))
+
     # --------------------------------------------------
     # HITL RESUME
     # --------------------------------------------------
 
-    def resume_from_hitl(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+    async def resume_from_hitl(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         hitl_id = payload["hitl_request_id"]
         action = payload["action"]
 
@@ -148,12 +388,15 @@ class MultiAgentSystem:
             }
 
         if action == "approve":
-            explanation = self.explainer.explain(
+            lost = self._claim_hitl(hitl_id, record)
+            if lost:
+                return lost
+
+            explanation = await self.explainer.aexplain(
                 problem_text=record["problem_data"]["problem_text"],
                 verified_solution=record["solution"],
                 verification_confidence=record["verification"]["confidence"]
             )
-            record["state"] = "RESOLVED"
             return {
                 "status": "SUCCESS",
                 "final_answer": record["solution"]["final_answer"],
@@ -163,7 +406,9 @@ class MultiAgentSystem:
             }
 
         if action == "reject":
-            record["state"] = "RESOLVED"
+            lost = self._claim_hitl(hitl_id, record)
+            if lost:
+                return lost
             return {"status": "REJECTED"}
 
         if action == "edit_problem":
@@ -172,8 +417,14 @@ class MultiAgentSystem:
                 return {"status": "ERROR", "error": "edited_problem_text required"}
 
             record["problem_data"]["problem_text"] = edited_text
-            record["state"] = "RESOLVED"
-            record["resolution_type"] = "EDITED_PROBLEM"
+            lost = self._claim_hitl(
+                hitl_id,
+                record,
+                problem_data=record["problem_data"],
+                resolution_type="EDITED_PROBLEM"
+            )
+            if lost:
+                return lost
 
             return {
                 "status": "NEEDS_RERUN",
@@ -194,13 +445,17 @@ class MultiAgentSystem:
                     "error": "corrected_solution must include final_answer and steps"
                 }
 
-            explanation = self.explainer.explain(
+            lost = self._claim_hitl(
+                hitl_id, record, resolution_type="EDITED_PROBLEM"
+            )
+            if lost:
+                return lost
+
+            explanation = await self.explainer.aexplain(
                 problem_text=record["problem_data"]["problem_text"],
                 verified_solution=corrected,
                 verification_confidence=1.0
             )
-            record["state"] = "RESOLVED"
-            record["resolution_type"] = "EDITED_PROBLEM"
 
             return {
                 "status": "SUCCESS",
@@ -210,57 +465,125 @@ class MultiAgentSystem:
                 "confidence": 1.0
             }
 
+    def _claim_hitl(
+        self,
+        hitl_id: str,
+        record: Dict[str, Any],
+        **updates: Any
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Atomic PENDING_REVIEW -> RESOLVED transition, taken BEFORE any
+        side effects so two concurrent resolves cannot both succeed.
+        Returns an error response if another request won.
+        """
+        if HITL_STORE.cas_state(hitl_id, record["state"], "RESOLVED", updates):
+            return None
+        return {
+            "status": "ERROR",
+            "error": "HITL request already resolved (state=RESOLVED)"
+        }
+
 # --------------------------------------------------
 # GLOBAL SYSTEM
 # --------------------------------------------------
 def cleanup_hitl_store():
     """
-    Placeholder for TTL / DB cleanup.
-    In production, resolved HITL records should expire.
+    Drops expired HITL records (no-op for Redis, which expires keys itself).
     """
-    pass
+    HITL_STORE.purge_expired()
 
 system = MultiAgentSystem(llm_provider="auto")
 
+# --------------------------------------------------
+# ASYNC BRIDGE
+# --------------------------------------------------
+
+# Flask runs each async view on a throwaway loop, but async SDK clients
+# keep connection pools bound to the loop they were first used on.
+# Under Flask, pipeline work is handed to one long-lived loop per worker;
+# Quart already serves every request on the worker's single loop.
+_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_LOOP_LOCK = threading.Lock()
+
+
+def _worker_loop() -> asyncio.AbstractEventLoop:
+    global _LOOP
+    with _LOOP_LOCK:
+        if _LOOP is None:
+            _LOOP = asyncio.new_event_loop()
+            threading.Thread(target=_LOOP.run_forever, daemon=True).start()
+    return _LOOP
+
+
+async def run_pipeline(coro):
+    if USE_QUART:
+        return await coro
+    return await asyncio.wrap_future(
+        asyncio.run_coroutine_threadsafe(coro, _worker_loop())
+    )
+
+
+def ojsonify(obj: Any, status: int = 200) -> Response:
+    """
+    jsonify() replacement: orjson is several times faster than the
+    stdlib encoder on the nested agent_trace payloads.
+    """
+    return Response(
+        orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS),
+        status=status,
+        mimetype="application/json"
+    )
+
+
+async def _json_payload() -> Optional[Dict[str, Any]]:
+    if not request.is_json:
+        return None
+    payload = request.get_json()
+    if inspect.isawaitable(payload):  # Quart
+        payload = await payload
+    return payload
+
 # --------------------------------------------------
 # ROUTES
 # --------------------------------------------------
 
 @app.route("/", methods=["GET"]) 
-def index():
+async def index():
     return """<pre> Math Reasoning System ==================== A multi-agent system for solving mathematical problems. 
     Available Routes: GET /health - Check service health 
     POST /solve - Submit a math problem (requires JSON payload) 
     Example request: POST /solve { "problem_text": "Solve 2x + 5 = 15", "topic": "algebra", "variables": ["x"], "retrieved_context": [] } </pre>"""
 
 @app.route("/health", methods=["GET"])
-def health():
-    return jsonify({"status": "healthy"}), 200
+async def health():
+    return ojsonify({"status": "healthy"})
 
 @app.route("/solve", methods=["POST"])
-def solve():
-    if not request.is_json:
-        return jsonify({"error": "JSON required"}), 400
+async def solve():
+    data = await _json_payload()
 
-    data = request.get_json()
+    if data is None:
+        return ojsonify({"error": "JSON required"}, 400)
 
     if "problem_text" not in data:
-        return jsonify({"error": "problem_text is required"}), 400
+        return ojsonify({"error": "problem_text is required"}, 400)
 
-    return jsonify(system.process_problem(data)), 200
+    result = await run_pipeline(system.process_problem(data))
+    return ojsonify(result)
 
 
 @app.route("/hitl/resolve", methods=["POST"])
-def hitl_resolve():
-    if not request.is_json:
-        return jsonify({"error": "JSON required"}), 400
+async def hitl_resolve():
+    payload = await _json_payload()
 
-    payload = request.get_json()
+    if payload is None:
+        return ojsonify({"error": "JSON required"}, 400)
 
     if not {"hitl_request_id", "action"}.issubset(payload):
-        return jsonify({"error": "Missing HITL fields"}), 400
+        return ojsonify({"error": "Missing HITL fields"}, 400)
 
-    return jsonify(system.resume_from_hitl(payload)), 200
+    result = await run_pipeline(system.resume_from_hitl(payload))
+    return ojsonify(result)
 
 
 
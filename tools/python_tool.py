@@ -1,5 +1,465 @@
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
+from concurrent.futures import Future, ProcessPoolExecutor
+from fractions import Fraction
+from functools import lru_cache
+import ast
+import math
+import multiprocessing
+import operator
+import os
+import re
+import threading
 import sympy
+from sympy.parsing.sympy_parser import (
+    TokenError,
+    convert_xor,
+    implicit_multiplication_application,
+    parse_expr,
+    standard_transformations
+)
+
+try:
+    import symengine as _se  # optional: C++ numeric fast path
+except ImportError:
+    _se = None
+
+try:
+    import numpy as np  # optional: evaluate_batch
+except ImportError:
+    np = None
+
+try:
+    import numba  # optional: JIT for evaluate_batch
+except ImportError:
+    numba = None
+
+try:
+    from joblib import Memory  # optional: on-disk result cache
+except ImportError:
+    Memory = None
+
+# Built once: "^" is parsed as power, no string rewrite needed
+_TRANS = standard_transformations + (convert_xor,)
+
+# Also accepts "2x" and "3(x+1)" as written in problem text
+_PROBLEM_TRANS = _TRANS + (implicit_multiplication_application,)
+
+# Shared, never written to by parse_expr
+_LOCALS: Dict[str, Any] = {}
+
+# "x = 2, x = -3", "2 or -3", "x = 2 and x = -3"
+_ANSWER_SPLIT_RE = re.compile(r",|;|\bor\b|\band\b")
+
+# verify() parses LLM output, and parse_expr evals it. Only numbers,
+# arithmetic, single-letter variables and these names get through;
+# "." is allowed only inside a decimal, so there is no attribute access.
+_UNTRUSTED_FUNCS = frozenset(("sqrt", "pi", "E", "I", "exp", "log", "ln", "sin", "cos", "tan"))
+_UNTRUSTED_RE = re.compile(r"[\d\s+\-*/^().A-Za-z]*")
+_UNTRUSTED_NAME_RE = re.compile(r"[A-Za-z][A-Za-z0-9]*")
+_NON_DECIMAL_DOT_RE = re.compile(r"(?<!\d)\.|\.(?!\d)")
+# Size caps checked on the unevaluated parse: SymPy evaluates integer
+# powers like 9^9^8 in one GIL-holding call no timeout can interrupt
+_UNTRUSTED_MAX_BITS = 4096
+_UNTRUSTED_MAX_DEGREE = 100
+
+_CACHE_SIZE = 4096
+
+# Failures that are the input's fault; anything else is a bug and
+# propagates. TokenError comes from the tokenizer on unbalanced input,
+# NotImplementedError from solve() when no algorithm applies. Errors
+# raised while parse_expr or lambdified code runs the input are
+# converted to ValueError where they happen.
+_TOOL_ERRORS = (
+    sympy.SympifyError,
+    TokenError,
+    SyntaxError,
+    TypeError,
+    ValueError,
+    NotImplementedError
+)
+
+# Integer-literal arithmetic evaluated exactly with Fractions, then
+# rounded once, which matches float() of SymPy's Rational. Decimals,
+# names (pi, sqrt, ...) and fractional powers go to SymPy.
+_ARITH_RE = re.compile(r"[\d+\-*/()\s^]+")
+_ARITH_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv
+}
+# Numerator / denominator size cap, so "9^9^9" is left to SymPy
+_ARITH_MAX_BITS = 4096
+
+_NAME_RE = re.compile(r"[A-Za-z]+")
+
+
+# --------------------------------------------------
+# MEMOIZED COMPUTATIONS
+# --------------------------------------------------
+# Keyed on normalized input strings. Results are immutable
+# (SymPy objects, floats, strings, tuples), so sharing is safe.
+
+# Optional second tier under the in-process LRU, enabled by
+# SYMPY_CACHE_DIR: the heavy symbolic results survive restarts and are
+# shared by processes using the same directory. joblib never evicts,
+# so the directory is trimmed to SYMPY_CACHE_LIMIT at import.
+_SYMPY_CACHE_DIR = os.environ.get("SYMPY_CACHE_DIR")
+
+if Memory is not None and _SYMPY_CACHE_DIR:
+    _disk_memory = Memory(_SYMPY_CACHE_DIR, compress=3, verbose=0)
+    _disk_memory.reduce_size(
+        bytes_limit=os.environ.get("SYMPY_CACHE_LIMIT", "256M")
+    )
+    _disk_cache = _disk_memory.cache
+else:
+    _disk_memory = None
+
+    def _disk_cache(fn):
+        return fn
+
+
+def _error(e: BaseException) -> Dict[str, Any]:
+    # args[0] instead of str(e): some SymPy errors format large
+    # expressions in __str__
+    message = e.args[0] if e.args else None
+    return {
+        "success": False,
+        "result": None,
+        "error": message if isinstance(message, str) else type(e).__name__
+    }
+
+
+def _field(request: Dict[str, Any], name: str) -> Any:
+    try:
+        return request[name]
+    except KeyError:
+        raise ValueError(f"Missing request field: {name}") from None
+
+
+def _normalize(expression: str) -> str:
+    if not isinstance(expression, str):
+        raise TypeError("expression must be a string")
+    return expression.strip()
+
+
+@lru_cache(maxsize=512)
+def _symbol(name: str) -> sympy.Symbol:
+    # Symbols are immutable; one shared instance per name
+    return sympy.Symbol(name)
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def _s(expr: sympy.Basic) -> str:
+    """
+    Printed form of an expression, memoized. SymPy objects do not
+    support weak references, so this is keyed on the (immutable,
+    hashable) Expr itself: structurally equal results print once.
+    """
+    return str(expr)
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def _parse_cached(expr_str: str) -> sympy.Expr:
+    try:
+        expr = parse_expr(expr_str, local_dict=_LOCALS, transformations=_TRANS)
+    except (AttributeError, IndexError) as e:
+        # parse_expr evals the input: "x.y", "lambda x: x"
+        raise ValueError(f"Invalid expression: {expr_str}") from e
+
+    if isinstance(expr, bool):
+        # "x == 1" is a structural comparison in Python
+        return sympy.sympify(expr)
+    if isinstance(expr, sympy.Lambda) or not isinstance(expr, (sympy.Basic, sympy.MatrixBase)):
+        # "lambda x: x", "None", "x, y", "'a'", "print"
+        raise TypeError(f"Not a mathematical expression: {type(expr).__name__}")
+    return expr
+
+
+def _parse_untrusted(text: str) -> sympy.Expr:
+    """
+    parse_expr for text from an LLM or a user. Raises ValueError on
+    anything outside the whitelist above instead of evaluating it.
+    """
+    if not _UNTRUSTED_RE.fullmatch(text) or _NON_DECIMAL_DOT_RE.search(text):
+        raise ValueError("Unsupported characters in expression")
+
+    local_dict: Dict[str, Any] = {}
+    for name in _UNTRUSTED_NAME_RE.findall(text):
+        if name in _UNTRUSTED_FUNCS:
+            continue
+        if len(name) != 1:
+            raise ValueError(f"Unsupported name in expression: {name}")
+        # Bind letters to Symbols so "S", "N", "Q" etc. are not SymPy objects
+        local_dict[name] = _symbol(name)
+
+    _check_size(parse_expr(
+        text, local_dict=local_dict, transformations=_PROBLEM_TRANS, evaluate=False
+    ))
+    return parse_expr(text, local_dict=local_dict, transformations=_PROBLEM_TRANS)
+
+
+def _check_size(node: sympy.Basic) -> int:
+    """
+    Upper bound on the bits of an unevaluated tree's numeric parts;
+    raises ValueError past _UNTRUSTED_MAX_BITS, or for a symbolic base
+    raised past _UNTRUSTED_MAX_DEGREE.
+    """
+    if node.is_Rational:
+        bits = max(int(node.p).bit_length(), int(node.q).bit_length())
+    elif node.is_Pow:
+        bits = _check_size(node.base)
+        _check_size(node.exp)
+        if not node.exp.free_symbols:
+            # Safe to evaluate now: every power inside it passed this check
+            exponent = abs(complex(node.exp))
+            if node.base.free_symbols:
+                if exponent > _UNTRUSTED_MAX_DEGREE:
+                    raise ValueError("Exponent too large")
+            else:
+                bits *= max(1, math.ceil(exponent))
+    elif node.args:
+        bits = sum(map(_check_size, node.args))
+    else:
+        bits = 1
+
+    if bits > _UNTRUSTED_MAX_BITS:
+        raise ValueError("Number too large")
+    return bits
+
+
+def _parse_equation(equation: str) -> sympy.Expr:
+    """
+    "lhs = rhs" as lhs - rhs; each side is parsed (and cached) separately.
+    """
+    if "=" in equation:
+        lhs, rhs = equation.split("=", 1)
+        return _parse_cached(_normalize(lhs)) - _parse_cached(_normalize(rhs))
+    return _parse_cached(_normalize(equation))
+
+
+# The symbolic helpers below are keyed on parsed Exprs (hashable),
+# so callers that already hold an Expr skip the parser entirely.
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def _simplify_cached(expr: sympy.Expr, deep: bool = False) -> str:
+    return _s(sympy.simplify(expr) if deep else _light_simplify(expr))
+
+
+def _light_simplify(expr: sympy.Expr) -> sympy.Expr:
+    """
+    Cheap passes only (rational cancel + power combining), kept only
+    if they do not make the expression bigger. Full simplify() tries
+    dozens of heuristics and is much slower.
+    """
+    light = sympy.powsimp(sympy.cancel(expr), combine="exp")
+    return light if sympy.count_ops(light) <= sympy.count_ops(expr) else expr
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+@_disk_cache
+def _solve_cached(expr: sympy.Expr, variable: str) -> Tuple[str, ...]:
+    solutions = sympy.solve(expr, _symbol(variable))
+    return tuple(map(_s, solutions))
+
+
+# Above this size, shared subtrees are worth factoring out first
+_CSE_MIN_OPS = 50
+
+
+def _freeze_constants(
+    expr: sympy.Expr,
+    x: sympy.Symbol
+) -> Tuple[sympy.Expr, List[Tuple[sympy.Symbol, sympy.Expr]]]:
+    """
+    CSE that keeps only the common subexpressions free of x as
+    placeholder symbols. Those are constants for diff, so a first
+    derivative is unchanged; subexpressions that depend on x are put
+    back so the chain rule still sees them.
+
+    Returns the reduced expression and the (placeholder, value) pairs
+    to substitute back, in reverse order.
+    """
+    repls, (reduced,) = sympy.cse(
+        expr, symbols=sympy.numbered_symbols(cls=sympy.Dummy)
+    )
+
+    frozen: List[Tuple[sympy.Symbol, sympy.Expr]] = []
+    thawed: Dict[sympy.Symbol, sympy.Expr] = {}
+    for sym, sub in repls:
+        sub = sub.xreplace(thawed)
+        if x in sub.free_symbols:
+            thawed[sym] = sub
+        else:
+            frozen.append((sym, sub))
+
+    frozen.reverse()
+    return reduced.xreplace(thawed), frozen
+
+
+def _thaw(expr: sympy.Expr, frozen: List[Tuple[sympy.Symbol, sympy.Expr]]) -> sympy.Expr:
+    # Later placeholders may refer to earlier ones; substitute one at a time
+    for sym, sub in frozen:
+        expr = expr.xreplace({sym: sub})
+    return expr
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+@_disk_cache
+def _diff_cached(expr: sympy.Expr, variable: str, order: int) -> str:
+    x = _symbol(variable)
+
+    # Only first derivatives thaw back to exactly what diff() prints.
+    # Higher orders come out in a different (equal) form, and
+    # integrate() picks its method and Piecewise conditions from the
+    # integrand's structure, so neither uses placeholders.
+    if order == 1 and sympy.count_ops(expr) > _CSE_MIN_OPS:
+        reduced, frozen = _freeze_constants(expr, x)
+        return _s(_thaw(sympy.diff(reduced, x), frozen))
+
+    return _s(sympy.diff(expr, x, order))
+
+
+# typed: 0 == 0.0 hash alike but give Integer vs Float bounds, and
+# so different results
+@lru_cache(maxsize=_CACHE_SIZE, typed=True)
+@_disk_cache
+def _integrate_cached(
+    expr: sympy.Expr,
+    variable: str,
+    lower: Optional[Any],
+    upper: Optional[Any]
+) -> str:
+    x = _symbol(variable)
+
+    if lower is not None and upper is not None:
+        return _s(sympy.integrate(expr, (x, lower, upper)))
+    return _s(sympy.integrate(expr, x))
+
+
+class _Compiled:
+    """
+    A lambdified expression and, when numba is available, its JIT
+    version. jitted is dropped after its first failure so an
+    expression numba cannot type is not recompiled on every call.
+    """
+
+    __slots__ = ("fn", "jitted")
+
+    def __init__(self, fn, jitted):
+        self.fn = fn
+        self.jitted = jitted
+
+    def __call__(self, *columns):
+        if self.jitted is not None:
+            try:
+                return self.jitted(*columns)
+            except Exception:
+                self.jitted = None
+        try:
+            return self.fn(*columns)
+        except NameError as e:
+            # An undefined function, or a symbol not in `variables`
+            raise ValueError(e.args[0]) from e
+
+
+@lru_cache(maxsize=512)
+def _lambdify_cached(expr_str: str, var_tuple: Tuple[str, ...]) -> _Compiled:
+    # cse=True: shared subexpressions are computed once per call
+    try:
+        fn = sympy.lambdify(
+            [_symbol(v) for v in var_tuple],
+            _parse_cached(expr_str),
+            modules="numpy",
+            cse=True
+        )
+    except KeyError as e:
+        # The numpy printer has no entry for nodes like zoo
+        raise ValueError("Expression cannot be evaluated numerically") from e
+    # Compiles lazily on first call. No cache=True: lambdified
+    # functions have no source file for numba to cache against.
+    return _Compiled(fn, numba.njit(fn) if numba is not None else None)
+
+
+def _exact(node: ast.AST) -> Fraction:
+    if isinstance(node, ast.Constant) and type(node.value) is int:
+        return Fraction(node.value)
+
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.UAdd, ast.USub)):
+        operand = _exact(node.operand)
+        return -operand if isinstance(node.op, ast.USub) else operand
+
+    if not isinstance(node, ast.BinOp):
+        raise ValueError("not integer arithmetic")
+
+    left, right = _exact(node.left), _exact(node.right)
+    if isinstance(node.op, ast.Pow):
+        size = max(left.numerator.bit_length(), left.denominator.bit_length())
+        if right.denominator != 1 or abs(right.numerator) * size > _ARITH_MAX_BITS:
+            raise ValueError("power needs SymPy")
+        value = left ** right.numerator
+    elif type(node.op) in _ARITH_OPS:
+        value = _ARITH_OPS[type(node.op)](left, right)
+    else:
+        raise ValueError("not integer arithmetic")
+
+    if max(value.numerator.bit_length(), value.denominator.bit_length()) > _ARITH_MAX_BITS:
+        raise ValueError("operand too large")
+    return value
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def _const_eval(expr_str: str) -> Optional[float]:
+    """
+    Float value of integer arithmetic like "2+3*4" or "(7-1)/4^2",
+    or None if the input needs SymPy.
+    """
+    if not _ARITH_RE.fullmatch(expr_str):
+        return None
+
+    try:
+        tree = ast.parse(expr_str.replace("^", "**"), mode="eval")
+        return float(_exact(tree.body))
+    except (ArithmeticError, ValueError, SyntaxError, RecursionError):
+        # ZeroDivisionError ("1/0" -> zoo) and OverflowError included
+        return None
+
+
+def _fast_numeric(expr_str: str) -> float:
+    """
+    Numeric value via SymEngine; raises for symbolic, complex
+    or unsupported input so the caller can fall back to SymPy.
+    """
+    if "e" in _NAME_RE.findall(expr_str):
+        # SymEngine reads a bare "e" as Euler's number, SymPy as a symbol
+        raise ValueError("ambiguous constant 'e'")
+
+    value = _se.sympify(expr_str)
+    # Only exact rationals, which float() rounds like SymPy. Booleans
+    # ("True") are not numbers; forms left unevaluated, like
+    # log(8)/log(2), and double arithmetic on decimal input round
+    # differently from SymPy.
+    if not value.is_Rational:
+        raise ValueError("not an exact number")
+
+    numeric = float(value)
+    if not math.isfinite(numeric):
+        # Too large for a float; _evaluate_parsed decides
+        raise ValueError("not finite")
+    return numeric
+
+
+_CACHED_HELPERS = (
+    _symbol,
+    _s,
+    _const_eval,
+    _lambdify_cached,
+    _parse_cached,
+    _simplify_cached,
+    _solve_cached,
+    _diff_cached,
+    _integrate_cached
+)
 
 
 class PythonTool:
@@ -8,10 +468,25 @@ class PythonTool:
     This tool MUST NOT mutate solver outputs silently.
     """
 
-    def evaluate(self, expression: str) -> Dict[str, Any]:
+    @staticmethod
+    def cache_clear(disk: bool = False) -> None:
+        """
+        Drop all in-process memoized results (shared by every
+        instance). disk: also empty the SYMPY_CACHE_DIR cache, which
+        other processes may be sharing.
+        """
+        for helper in _CACHED_HELPERS:
+            helper.cache_clear()
+        if disk and _disk_memory is not None:
+            _disk_memory.clear(warn=False)
+
+    def evaluate(self, expression: str, deep: bool = False) -> Dict[str, Any]:
         """
         Evaluate or simplify a mathematical expression.
 
+        deep: use full sympy.simplify for symbolic results
+        instead of the cheap cancel/powsimp passes.
+
         Returns:
         {
           "success": bool,
@@ -20,33 +495,80 @@ class PythonTool:
         }
         """
         try:
-            expr = sympy.sympify(expression.replace("^", "**"))
+            expr_str = _normalize(expression)
 
-            # Try numeric evaluation
-            try:
-                numeric = expr.evalf()
-                if numeric.is_real:
+            constant = _const_eval(expr_str)
+            if constant is not None:
+                return {
+                    "success": True,
+                    "result": constant,
+                    "error": None
+                }
+
+            if _se is not None:
+                try:
                     return {
                         "success": True,
-                        "result": float(numeric),
+                        "result": _fast_numeric(expr_str),
                         "error": None
                     }
-            except Exception:
-                pass
+                except Exception:
+                    pass
+
+            return self._evaluate_parsed(_parse_cached(expr_str), deep)
+
+        except _TOOL_ERRORS as e:
+            return _error(e)
+
+    def evaluate_batch(
+        self,
+        expression: str,
+        variables: List[str],
+        values: Any
+    ) -> Dict[str, Any]:
+        """
+        Evaluate one expression at many points.
+
+        values: shape (n_points, len(variables)), one column per variable.
+        The expression is compiled once per (expression, variables) pair.
+
+        Returns:
+        {
+          "success": bool,
+          "result": list[float] | None,
+          "error": str | None
+        }
+        """
+        try:
+            if np is None:
+                return _error(ImportError("numpy is required for evaluate_batch"))
+
+            points = np.asarray(values, dtype=float)
+            if points.ndim == 1 and len(variables) == 1:
+                points = points[:, None]
+            # No reshape: a flat or mis-shaped array would silently
+            # regroup values into the wrong points
+            if points.ndim != 2 or points.shape[1] != len(variables):
+                raise ValueError(
+                    f"values must have shape (n_points, {len(variables)}), "
+                    f"got {points.shape}"
+                )
+            compiled = _lambdify_cached(_normalize(expression), tuple(variables))
+
+            # Constant expressions come back as a scalar
+            result = np.broadcast_to(
+                np.asarray(compiled(*points.T), dtype=float),
+                (points.shape[0],)
+            )
 
-            # Fallback to symbolic simplification
             return {
                 "success": True,
-                "result": str(sympy.simplify(expr)),
+                "result": result.tolist(),
                 "error": None
             }
 
-        except Exception as e:
-            return {
-                "success": False,
-                "result": None,
-                "error": str(e)
-            }
+        except _TOOL_ERRORS as e:
+            return _error(e)
 
     def solve_equation(
         self,
@@ -57,27 +579,10 @@ class PythonTool:
         Solve an equation for a variable.
         """
         try:
-            if "=" in equation:
-                lhs, rhs = equation.split("=")
-                expr = sympy.sympify(f"({lhs}) - ({rhs})")
-            else:
-                expr = sympy.sympify(equation)
-
-            var = sympy.Symbol(variable)
-            solutions = sympy.solve(expr, var)
-
-            return {
-                "success": True,
-                "result": [str(sol) for sol in solutions],
-                "error": None
-            }
+            return self._solve_parsed(_parse_equation(equation), variable)
 
-        except Exception as e:
-            return {
-                "success": False,
-                "result": None,
-                "error": str(e)
-            }
+        except _TOOL_ERRORS as e:
+            return _error(e)
 
     def derivative(
         self,
@@ -89,22 +594,12 @@ class PythonTool:
         Compute the derivative.
         """
         try:
-            x = sympy.Symbol(variable)
-            expr = sympy.sympify(expression)
-            result = sympy.diff(expr, x, order)
+            return self._derivative_parsed(
+                _parse_cached(_normalize(expression)), variable, order
+            )
 
-            return {
-                "success": True,
-                "result": str(result),
-                "error": None
-            }
-
-        except Exception as e:
-            return {
-                "success": False,
-                "result": None,
-                "error": str(e)
-            }
+        except _TOOL_ERRORS as e:
+            return _error(e)
 
     def integral(
         self,
@@ -117,23 +612,232 @@ class PythonTool:
         Compute an integral (definite or indefinite).
         """
         try:
-            x = sympy.Symbol(variable)
-            expr = sympy.sympify(expression)
+            return self._integral_parsed(
+                _parse_cached(_normalize(expression)), variable, lower, upper
+            )
 
-            if lower is not None and upper is not None:
-                result = sympy.integrate(expr, (x, lower, upper))
-            else:
-                result = sympy.integrate(expr, x)
+        except _TOOL_ERRORS as e:
+            return _error(e)
+
+    def batch(self, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Run several operations in one call, e.g. derivative, integral
+        and evaluate of the same expression. Each distinct expression
+        string is parsed once (parses are memoized).
+
+        Each request: {"op": "evaluate" | "solve" | "derivative" | "integral",
+                       "expression": str, "variable": str, ...}
+        with the optional "deep", "order", "lower", "upper" arguments
+        of the matching method. Results keep the request order.
+        """
+        results: List[Dict[str, Any]] = []
+
+        for req in requests:
+            try:
+                op = _field(req, "op")
+                expression = _field(req, "expression")
+
+                if op == "evaluate":
+                    # String-level fast paths run before parsing
+                    results.append(self.evaluate(expression, req.get("deep", False)))
+                elif op == "solve":
+                    results.append(self._solve_parsed(
+                        _parse_equation(expression), _field(req, "variable")
+                    ))
+                elif op == "derivative":
+                    results.append(self._derivative_parsed(
+                        _parse_cached(_normalize(expression)),
+                        _field(req, "variable"),
+                        req.get("order", 1)
+                    ))
+                elif op == "integral":
+                    results.append(self._integral_parsed(
+                        _parse_cached(_normalize(expression)),
+                        _field(req, "variable"),
+                        req.get("lower"),
+                        req.get("upper")
+                    ))
+                else:
+                    raise ValueError(f"Unknown op: {op}")
+
+            except _TOOL_ERRORS as e:
+                results.append(_error(e))
+
+        return results
 
+    def batch_async(self, requests: List[Dict[str, Any]]) -> List[Future]:
+        """
+        Like batch(), but each request runs in a shared process pool,
+        so independent SymPy work is not serialized by the GIL.
+        Returns one concurrent.futures.Future per request, in order
+        (use asyncio.wrap_future to await them from a loop).
+
+        Only the request dicts cross the process boundary; each worker
+        keeps its own memo caches.
+        """
+        pool = _process_pool()
+        return [pool.submit(_run_request, req) for req in requests]
+
+    # --------------------------------------------------
+    # PARSED-EXPRESSION CORE
+    # --------------------------------------------------
+
+    def _evaluate_parsed(self, expr: sympy.Expr, deep: bool) -> Dict[str, Any]:
+        if not isinstance(expr, sympy.Expr):
+            # Matrices, relationals, booleans: full simplify as before.
+            # str(), not _s(): matrices are mutable and unhashable.
             return {
                 "success": True,
-                "result": str(result),
+                "result": str(sympy.simplify(expr)),
                 "error": None
             }
 
-        except Exception as e:
+        # Try numeric evaluation. is_number is False whenever there
+        # are free symbols; float() raises TypeError for complex
+        # values, which skips the is_real assumption query.
+        if expr.is_number:
+            try:
+                numeric = float(expr)
+                # A finite value too large for a float (10^400,
+                # exp(1000)) is returned as inf, as the original
+                # evalf-based path did; oo / zoo / nan stay symbolic
+                if math.isfinite(numeric) or expr.is_finite:
+                    return {
+                        "success": True,
+                        "result": numeric,
+                        "error": None
+                    }
+            except TypeError:
+                pass
+
+        # Fallback to symbolic simplification
+        return {
+            "success": True,
+            "result": _simplify_cached(expr, deep),
+            "error": None
+        }
+
+    def _solve_parsed(self, expr: sympy.Expr, variable: str) -> Dict[str, Any]:
+        # Variable absent (often a mismatched name from the LLM):
+        # answer from the free-symbol set instead of running solve()
+        if _symbol(variable) not in expr.free_symbols:
             return {
-                "success": False,
-                "result": None,
-                "error": str(e)
+                "success": True,
+                "result": ["All reals"] if expr == 0 else [],
+                "error": None
             }
+
+        return {
+            "success": True,
+            "result": list(_solve_cached(expr, variable)),
+            "error": None
+        }
+
+    def _derivative_parsed(
+        self,
+        expr: sympy.Expr,
+        variable: str,
+        order: int
+    ) -> Dict[str, Any]:
+        return {
+            "success": True,
+            "result": _diff_cached(expr, variable, order),
+            "error": None
+        }
+
+    def _integral_parsed(
+        self,
+        expr: sympy.Expr,
+        variable: str,
+        lower: Optional[Any],
+        upper: Optional[Any]
+    ) -> Dict[str, Any]:
+        return {
+            "success": True,
+            "result": _integrate_cached(expr, variable, lower, upper),
+            "error": None
+        }
+
+    def verify(
+        self,
+        equation: str,
+        final_answer: str,
+        variable: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Check a claimed solution set of a one-variable equation.
+        Both strings may come from an LLM and are parsed through a
+        token whitelist, never evaluated as-is.
+
+        variable: the unknown the question asks for; the equation's
+        only free symbol must be it. Every "v = ..." label in the
+        answer must name that symbol too.
+
+        result is True only if every claimed root satisfies the
+        equation and the claim has as many roots as sympy finds.
+        False means the check could not confirm the answer, not that
+        the answer is wrong.
+        """
+        try:
+            lhs, rhs = equation.split("=")
+            expr = _parse_untrusted(lhs) - _parse_untrusted(rhs)
+            if len(expr.free_symbols) != 1:
+                return {
+                    "success": False,
+                    "result": None,
+                    "error": "Equation must have exactly one variable"
+                }
+            (var,) = expr.free_symbols
+            unconfirmed = {"success": True, "result": False, "error": None}
+            if variable is not None and var.name != variable:
+                return unconfirmed
+
+            claimed = set()
+            for part in _ANSWER_SPLIT_RE.split(final_answer):
+                label, _, value = part.rpartition("=")
+                if label and label.strip() != var.name:
+                    # "y = 5", or a chain like "x = y = 5"
+                    return unconfirmed
+                value = value.strip()
+                if value:
+                    claimed.add(_parse_untrusted(value))
+
+            ok = (
+                bool(claimed)
+                and all(sympy.simplify(expr.subs(var, root)) == 0 for root in claimed)
+                and len(claimed) == len(sympy.solve(expr, var))
+            )
+
+            return {
+                "success": True,
+                "result": ok,
+                "error": None
+            }
+
+        except _TOOL_ERRORS as e:
+            return _error(e)
+
+
+# --------------------------------------------------
+# PROCESS POOL
+# --------------------------------------------------
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+
+
+def _process_pool() -> ProcessPoolExecutor:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            # spawn, not fork: the web app has live threads and
+            # connection pools that must not be copied into workers
+            _POOL = ProcessPoolExecutor(
+                max_workers=max(1, (os.cpu_count() or 2) - 1),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _POOL
+
+
+def _run_request(request: Dict[str, Any]) -> Dict[str, Any]:
+    return PythonTool().batch([request])[0]